@@ -11,24 +11,37 @@ from telegram.ext import (
     MessageHandler,
     ConversationHandler,
     CallbackQueryHandler,
+    TypeHandler,
     filters,
     ContextTypes
 )
 
-from config import TELEGRAM_TOKEN
+from config import (
+    TELEGRAM_TOKEN, FACT_POOL_REFILL_INTERVAL, QUIZ_BANK_REFILL_INTERVAL, PROXY_PROBE_INTERVAL,
+    STATS_LOG_INTERVAL
+)
+from utils.openai_helper import close_async_client, proxy_pool, client_pool
+from utils.tts_cache import TTSTextCache
+from utils.fact_pool import fact_pool
+from utils.usage_tracker import usage_tracker
+from utils.rate_governor import rate_governor
+from utils.work_lanes import lanes_stats
+from utils.request_context import set_request_context
+from utils.update_processor import ChatOrderedUpdateProcessor
+from utils.telegram_rate_limiter import TelegramRateLimiter
 
 # Імпорт handlers
 from handlers.basic import start, help_command
 from handlers.gpt_handler import gpt_start, gpt_question, gpt_button_handler, gpt_voice
-from handlers.random_handler import random_fact, random_button_handler
+from handlers.random_handler import random_fact, random_button_handler, refill_fact_pool_job
 from handlers.talk_handler import (
     talk_start, talk_choose_person, talk_conversation, talk_end
 )
 from handlers.quiz_handler import (
-    quiz_start, quiz_choose_theme, quiz_answer, quiz_button_handler
+    quiz_start, quiz_choose_theme, quiz_answer, quiz_button_handler, refill_quiz_bank_job
 )
 from handlers.translate_handler import (
-    translate_start, translate_choose_language,
+    translate_start, translate_choose_language, translate_choose_multiple,
     translate_text, translate_voice, translate_button_handler
 )
 from handlers.voice_handler import handle_voice
@@ -69,19 +82,52 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             pass
 
+
+async def post_shutdown(application: Application):
+    """Звільняє ресурси після зупинки бота"""
+    fact_pool.save()
+    logger.info(f"Використання токенів: {usage_tracker.stats()}")
+    logger.info(f"Смуги виконання: {lanes_stats()}")
+    logger.info(f"Регулятор OpenAI: {rate_governor.stats()}")
+    logger.info(f"Ключі OpenAI: {client_pool.stats()}")
+    await close_async_client()
+    logger.info("Пул з'єднань OpenAI закрито")
+
+
+async def log_stats_job(context):
+    """Фонове завдання job queue - пише в лог метрики регулятора і ключів OpenAI"""
+    logger.info(f"Регулятор OpenAI: {rate_governor.stats()}")
+    logger.info(f"Ключі OpenAI: {client_pool.stats()}")
+
+
+async def probe_proxies_job(context):
+    """Фонове завдання job queue - перевіряє всі проксі та оновлює їх затримку"""
+    await proxy_pool.probe_all()
+
+
 def main():
     """🚀 Запуск бота"""
     logger.info("Запуск бота...")
 
-    from config import PROXY
-    if PROXY:
-        logger.info(f"Використовується проксі: {PROXY}")
+    from config import PROXIES
+    if PROXIES:
+        logger.info(f"Використовуються проксі: {', '.join(proxy_pool.stats())}")
     else:
         logger.info("Проксі не налаштовано")
 
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        .rate_limiter(TelegramRateLimiter())
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     # Ініціалізуємо кеш для TTS
-    application.bot_data['tts_cache'] = {}
+    application.bot_data['tts_cache'] = TTSTextCache()
+
+    # Контекст запиту (користувач) для регулятора звернень до OpenAI
+    application.add_handler(TypeHandler(Update, set_request_context), group=-1)
 
     # Регистрируем базові команди
     application.add_handler(CommandHandler("start", start))
@@ -106,6 +152,14 @@ def main():
     application.add_handler(CommandHandler("random", random_fact))
     application.add_handler(CallbackQueryHandler(random_button_handler, pattern="^random_"))
 
+    # Фонове поповнення пулу фактів для /random
+    if application.job_queue:
+        application.job_queue.run_repeating(
+            refill_fact_pool_job, interval=FACT_POOL_REFILL_INTERVAL, first=1
+        )
+    else:
+        logger.warning("JobQueue недоступна - пул фактів поповнюватиметься лише на вимогу")
+
     # ConversationHandler для /talk
     talk_handler = ConversationHandler(
         entry_points=[CommandHandler("talk", talk_start)],
@@ -140,11 +194,30 @@ def main():
     )
     application.add_handler(quiz_handler)
 
+    # Фонове поповнення банку питань квізу
+    if application.job_queue:
+        application.job_queue.run_repeating(
+            refill_quiz_bank_job, interval=QUIZ_BANK_REFILL_INTERVAL, first=5
+        )
+
+    # Періодична перевірка доступності та затримки проксі
+    if application.job_queue and len(proxy_pool.endpoints) > 1:
+        application.job_queue.run_repeating(
+            probe_proxies_job, interval=PROXY_PROBE_INTERVAL, first=0
+        )
+
+    # Періодичні метрики черг і очікування
+    if application.job_queue and STATS_LOG_INTERVAL > 0:
+        application.job_queue.run_repeating(
+            log_stats_job, interval=STATS_LOG_INTERVAL, first=STATS_LOG_INTERVAL
+        )
+
     # ConversationHandler для /translate
     translate_handler = ConversationHandler(
         entry_points=[CommandHandler("translate", translate_start)],
         states={
             CHOOSING_LANGUAGE: [
+                CallbackQueryHandler(translate_choose_multiple, pattern="^lang_(multi|toggle_.+|done)$"),
                 CallbackQueryHandler(translate_choose_language, pattern="^lang_")  # ← ВИПРАВЛЕНО!
             ],
             TRANSLATING: [
@@ -1,4 +1,5 @@
 
+import json
 import os
 from dotenv import load_dotenv
 
@@ -8,13 +9,128 @@ load_dotenv()
 # Отримуємо токени
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 OPENAI_TOKEN = os.getenv('OPENAI_TOKEN')
+# Додаткові ключі через кому - запити розподіляються між ними
+OPENAI_TOKENS = [token.strip() for token in os.getenv('OPENAI_TOKENS', '').split(',') if token.strip()]
 PROXY = os.getenv('PROXY')  # Додали проксі
+# Кілька проксі через кому - для кожного запиту вибирається найшвидший доступний
+PROXIES = [proxy.strip() for proxy in os.getenv('PROXIES', '').split(',') if proxy.strip()]
+if PROXY and PROXY not in PROXIES:
+    PROXIES.insert(0, PROXY)
+
+# Перевірка доступності проксі
+PROXY_PROBE_URL = os.getenv('PROXY_PROBE_URL', 'https://api.openai.com/v1/models')
+PROXY_PROBE_INTERVAL = float(os.getenv('PROXY_PROBE_INTERVAL', 60))
+PROXY_PROBE_TIMEOUT = float(os.getenv('PROXY_PROBE_TIMEOUT', 10))
+PROXY_EWMA_ALPHA = float(os.getenv('PROXY_EWMA_ALPHA', 0.3))
+
+# Налаштування пулу з'єднань до OpenAI
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 20))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 60))
+
+# Мінімальний інтервал (сек) між редагуваннями повідомлення при потоковій відповіді
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', 1.0))
+
+# Обмеження кешу текстів для озвучування (кнопка 🔊)
+TTS_CACHE_MAX_ENTRIES = int(os.getenv('TTS_CACHE_MAX_ENTRIES', 1000))
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+TTS_CACHE_TTL = float(os.getenv('TTS_CACHE_TTL', 6 * 60 * 60))
+
+# Кеш згенерованого аудіо (TTS) на диску
+TTS_AUDIO_CACHE_DIR = os.getenv('TTS_AUDIO_CACHE_DIR', 'cache/tts')
+TTS_AUDIO_CACHE_MAX_BYTES = int(os.getenv('TTS_AUDIO_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+# file_id завантажених зображень меню
+IMAGE_REGISTRY_FILE = os.getenv('IMAGE_REGISTRY_FILE', 'cache/images.json')
+
+# Голосові обробляються в пам'яті; якщо > 0 - файли, більші за поріг (байт), скидаються на диск
+VOICE_SPILL_THRESHOLD = int(os.getenv('VOICE_SPILL_THRESHOLD', 0))
+
+# Пул заздалегідь згенерованих фактів для /random
+FACT_POOL_TARGET_SIZE = int(os.getenv('FACT_POOL_TARGET_SIZE', 30))
+FACT_POOL_LOW_WATERMARK = int(os.getenv('FACT_POOL_LOW_WATERMARK', 10))
+FACT_POOL_BATCH_SIZE = int(os.getenv('FACT_POOL_BATCH_SIZE', 10))
+FACT_POOL_REFILL_INTERVAL = float(os.getenv('FACT_POOL_REFILL_INTERVAL', 300))
+FACT_POOL_SEEN_PER_USER = int(os.getenv('FACT_POOL_SEEN_PER_USER', 500))
+FACT_POOL_FILE = os.getenv('FACT_POOL_FILE')  # опціонально - зберігати пул між перезапусками
+
+# Банк питань квізу (окремо для кожної теми)
+QUIZ_BANK_TARGET_SIZE = int(os.getenv('QUIZ_BANK_TARGET_SIZE', 10))
+QUIZ_BANK_LOW_WATERMARK = int(os.getenv('QUIZ_BANK_LOW_WATERMARK', 3))
+QUIZ_BANK_BATCH_SIZE = int(os.getenv('QUIZ_BANK_BATCH_SIZE', 5))
+QUIZ_BANK_REFILL_INTERVAL = float(os.getenv('QUIZ_BANK_REFILL_INTERVAL', 600))
+
+# Бюджет історії діалогу /talk (токени) і мінімум останніх повідомлень без стиснення
+TALK_HISTORY_TOKEN_BUDGET = int(os.getenv('TALK_HISTORY_TOKEN_BUDGET', 3000))
+TALK_HISTORY_KEEP_MESSAGES = int(os.getenv('TALK_HISTORY_KEEP_MESSAGES', 6))
+
+# Кеш детермінованих відповідей (переклади); RESPONSE_CACHE_DB - шлях до SQLite (опціонально)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2000))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 7 * 24 * 60 * 60))
+RESPONSE_CACHE_DB = os.getenv('RESPONSE_CACHE_DB')
+
+# Ліміти одного ключа OpenAI (запитів і токенів на хвилину); з кількома ключами множаться
+CHAT_RPM = int(os.getenv('CHAT_RPM', 500))
+CHAT_TPM = int(os.getenv('CHAT_TPM', 200000))
+WHISPER_RPM = int(os.getenv('WHISPER_RPM', 50))
+TTS_RPM = int(os.getenv('TTS_RPM', 50))
+
+# Як часто писати в лог метрики регулятора та ключів OpenAI (сек, 0 - лише при зупинці)
+STATS_LOG_INTERVAL = float(os.getenv('STATS_LOG_INTERVAL', 600))
+
+# Пауза для ключа після 429 та після помилки авторизації (сек)
+KEY_COOLDOWN_RATE_LIMIT = float(os.getenv('KEY_COOLDOWN_RATE_LIMIT', 20))
+KEY_COOLDOWN_AUTH = float(os.getenv('KEY_COOLDOWN_AUTH', 600))
+
+# Повтори та запобіжник для викликів OpenAI
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 3))
+OPENAI_DEADLINE = float(os.getenv('OPENAI_DEADLINE', 45))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 30))
+
+# Скільки чатів обробляються паралельно (апдейти одного чату - завжди по черзі)
+MAX_CONCURRENT_CHATS = int(os.getenv('MAX_CONCURRENT_CHATS', 16))
+
+# Вихідні запити до Telegram: загальний ліміт (повідомлень/сек), ліміт на особистий чат
+# (повідомлень/сек) і на групу (повідомлень/хв), повтори після flood-wait (429)
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_GROUP_RATE = float(os.getenv('TELEGRAM_GROUP_RATE', 20))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', 2))
+
+# Смуги виконання: одночасні запити тексту, розпізнавання (Whisper) і синтезу (TTS)
+# та максимальна черга кожної смуги; сума смуг не має перевищувати OPENAI_MAX_CONNECTIONS
+TEXT_LANE_CONCURRENCY = int(os.getenv('TEXT_LANE_CONCURRENCY', 14))
+TRANSCRIPTION_LANE_CONCURRENCY = int(os.getenv('TRANSCRIPTION_LANE_CONCURRENCY', 3))
+SYNTHESIS_LANE_CONCURRENCY = int(os.getenv('SYNTHESIS_LANE_CONCURRENCY', 3))
+LANE_MAX_QUEUE = int(os.getenv('LANE_MAX_QUEUE', 50))
+
+# Модель чату за замовчуванням для всіх профілів задач
+OPENAI_CHAT_MODEL = os.getenv('OPENAI_CHAT_MODEL', 'gpt-4o-mini')
+
+# Перевизначення профілів задач (JSON), наприклад:
+# TASK_PROFILES='{"quiz_grade": {"model": "gpt-4o-mini", "max_tokens": 120}, "talk": {"temperature": 1.0}}'
+TASK_PROFILES = json.loads(os.getenv('TASK_PROFILES', '{}'))
+
+# Денний бюджет токенів на користувача (0 - без обмеження); після перевищення
+# запити користувача не блокуються, а обслуговуються регулятором OpenAI після запитів інших
+USER_DAILY_TOKEN_BUDGET = int(os.getenv('USER_DAILY_TOKEN_BUDGET', 0))
+
+# Хеджування потокових відповідей (HEDGE_ENABLED=1 щоб увімкнути)
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', '0') == '1'
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 95))
+HEDGE_MAX_RATE = float(os.getenv('HEDGE_MAX_RATE', 0.05))
+HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', 3.0))
 
 # Перевірка, що токени завантажені
 if not TELEGRAM_TOKEN:
     raise ValueError("TELEGRAM_TOKEN не знайдено в .env файлі!")
 
-if not OPENAI_TOKEN:
+if not OPENAI_TOKEN and not OPENAI_TOKENS:
     raise ValueError("OPENAI_TOKEN не знайдено в .env файлі!")
 
+if OPENAI_TOKEN and OPENAI_TOKEN not in OPENAI_TOKENS:
+    OPENAI_TOKENS.insert(0, OPENAI_TOKEN)
+if not OPENAI_TOKEN:
+    OPENAI_TOKEN = OPENAI_TOKENS[0]
+
 # Проксі опціональний, тому не вимагаємо його
@@ -2,10 +2,17 @@
 Оброблювач команди /gpt - ChatGPT інтерфейс
 """
 import logging
-import os
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.constants import ChatAction
 from telegram.ext import ContextTypes, ConversationHandler
-from utils.openai_helper import get_chatgpt_response, transcribe_audio, text_to_speech
+from utils.openai_helper import (
+    get_chatgpt_response_async, transcribe_audio_async, stream_chatgpt_response
+)
+from utils.telegram_stream import ProgressMessage
+from utils.tts_cache import get_tts_cache
+from utils.tts_audio_cache import reply_tts_voice
+from utils.image_registry import reply_menu_photo
+from utils.voice_io import downloaded_voice
 from utils.constants import WAITING_GPT_QUESTION
 
 logger = logging.getLogger(__name__)
@@ -16,16 +23,11 @@ async def gpt_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     logger.info(f"Користувач {user.first_name} ({user.id}) натиснув /gpt")
 
-    try:
-        with open('images/gpt.jpg', 'rb') as photo:
-            await update.message.reply_photo(
-                photo=photo,
-                caption="🤖 ChatGPT інтерфейс\n\nНапиши своє запитання текстом або надішліть голосове повідомлення 🎤"
-            )
-    except FileNotFoundError:
-        await update.message.reply_text(
-            "🤖 ChatGPT Інтерфейс\n\nНапиши своє запитання текстом або надішліть голосове повідомлення 🎤"
-        )
+    await reply_menu_photo(
+        update.message,
+        'images/gpt.jpg',
+        "🤖 ChatGPT інтерфейс\n\nНапиши своє запитання текстом або надішліть голосове повідомлення 🎤"
+    )
 
     return WAITING_GPT_QUESTION
 
@@ -38,15 +40,7 @@ async def gpt_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"GPT питання від {user.first_name}: {user_message}")
 
     try:
-        # Отримуємо відповідь від ChatGPT
-        response_text = get_chatgpt_response(user_message)
-
-        # Зберігаємо відповідь для озвучування
-        if 'tts_cache' not in context.bot_data:
-            context.bot_data['tts_cache'] = {}
-
         cache_key = f"{user.id}_{update.message.message_id}"
-        context.bot_data['tts_cache'][cache_key] = response_text
 
         # Створюємо клавіатуру з кнопкою озвучування
         keyboard = [
@@ -58,8 +52,14 @@ async def gpt_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        # Відправляємо відповідь
-        await update.message.reply_text(response_text, reply_markup=reply_markup)
+        # Показуємо відповідь ChatGPT по мірі генерації в одному повідомленні
+        response_text = await ProgressMessage(update.message).stream(
+            stream_chatgpt_response([{"role": "user", "content": user_message}]),
+            reply_markup=reply_markup
+        )
+
+        # Зберігаємо відповідь для озвучування
+        get_tts_cache(context.bot_data).put(cache_key, response_text)
 
         return WAITING_GPT_QUESTION
 
@@ -86,69 +86,44 @@ async def gpt_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.info(f"Запит озвучування для ключа: {cache_key}")
 
         # Отримуємо збережений текст
-        tts_cache = context.bot_data.get('tts_cache', {})
+        tts_cache = get_tts_cache(context.bot_data)
 
-        logger.info(f"Доступні ключі в кеші: {list(tts_cache.keys())}")
+        text_to_voice = tts_cache.get(cache_key)
 
-        if cache_key not in tts_cache:
+        logger.info(f"Стан TTS кешу: {tts_cache.stats()}")
+
+        if text_to_voice is None:
             await query.message.reply_text("❌ Текст для озвучування не знайдено. Можливо, він застарів.")
             logger.warning(f"Ключ {cache_key} не знайдено в кеші")
             return WAITING_GPT_QUESTION
 
-        text_to_voice = tts_cache[cache_key]
-
         logger.info(f"Знайдено текст довжиною {len(text_to_voice)} символів")
 
-        await query.message.reply_text("🎙️ Створюю аудіо, зачекайте...")
+        # Замість статусного повідомлення - індикатор "записує аудіо"
+        await ProgressMessage(query.message).show_action(ChatAction.RECORD_VOICE)
 
-        # Створюємо унікальне ім'я файлу
-        output_path = f"temp/tts_{user.id}_{cache_key}.mp3"
+        # Кнопки одразу під голосовим
+        keyboard = [
+            [InlineKeyboardButton("❓ Ще питання", callback_data="gpt_continue")],
+            [InlineKeyboardButton("❌ Закінчити", callback_data="gpt_end")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
 
         try:
-            # Створюємо папку temp якщо немає
-            os.makedirs("temp", exist_ok=True)
-
-            logger.info(f"Генерую аудіо в файл: {output_path}")
-
-            # Генеруємо аудіо
-            if text_to_speech(text_to_voice, output_path):
-                logger.info("Аудіо успішно згенеровано, відправляю...")
-
-                # Відправляємо голосове
-                with open(output_path, 'rb') as audio_file:
-                    await query.message.reply_voice(voice=audio_file)
-
+            # Генеруємо аудіо (або беремо з кешу) і відправляємо голосове
+            if await reply_tts_voice(query.message, text_to_voice, caption="🎙️ Що далі?", reply_markup=reply_markup):
                 logger.info("Голосове повідомлення відправлено")
 
-                # Видаляємо файл
-                os.remove(output_path)
-                logger.info("Тимчасовий файл видалено")
-
                 # Видаляємо з кешу
-                del tts_cache[cache_key]
+                tts_cache.pop(cache_key)
                 logger.info("Запис видалено з кешу")
-
-                # Додаємо кнопки після озвучування
-                keyboard = [
-                    [InlineKeyboardButton("❓ Ще питання", callback_data="gpt_continue")],
-                    [InlineKeyboardButton("❌ Закінчити", callback_data="gpt_end")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                await query.message.reply_text(
-                    "🎙️ Озвучування завершено!\n"
-                    "Що далі?",
-                    reply_markup=reply_markup
-                )
             else:
                 await query.message.reply_text("❌ Помилка при створенні аудіо. Перевірте логи OpenAI.")
-                logger.error("text_to_speech повернув False")
+                logger.error("reply_tts_voice повернув False")
 
         except Exception as e:
             logger.error(f"Помилка TTS: {e}", exc_info=True)
             await query.message.reply_text(f"❌ Помилка: {e}")
-            if os.path.exists(output_path):
-                os.remove(output_path)
 
         return WAITING_GPT_QUESTION
 
@@ -173,42 +148,29 @@ async def gpt_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def gpt_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обробляє голосове повідомлення у режимі /gpt"""
-    import os
-    from utils.openai_helper import transcribe_audio
-
     user = update.effective_user
     logger.info(f"Користувач {user.first_name} ({user.id}) надіслав голос в /gpt")
 
-    await update.message.reply_text("🎤 Обробляю голосове повідомлення...")
+    progress = ProgressMessage(update.message)
+    await progress.stage("🎤 Обробляю голосове повідомлення...")
 
     try:
-        voice = update.message.voice
-        voice_file = await context.bot.get_file(voice.file_id)
-
-        os.makedirs("temp", exist_ok=True)
-
-        voice_path = f"temp/gpt_voice_{user.id}.ogg"
-        await voice_file.download_to_drive(voice_path)
-
-        text = transcribe_audio(voice_path)
+        async with downloaded_voice(context.bot, update.message.voice) as audio:
+            text = await transcribe_audio_async(audio)
 
         if text.startswith("Помилка"):
-            await update.message.reply_text(f"❌ {text}")
-            os.remove(voice_path)
+            await progress.finish(f"❌ {text}")
             return WAITING_GPT_QUESTION
 
         logger.info(f"Розпізнаний текст у /gpt: {text}")
-        await update.message.reply_text(f"📝 Ти сказав: {text}\n\n⏳ Обробляю запит...")
+        await progress.stage(f"📝 Ти сказав: {text}\n\n⏳ Обробляю запит...")
 
         # Отримуємо відповідь від ChatGPT
-        response_text = get_chatgpt_response(text)
+        response_text = await get_chatgpt_response_async(text)
 
         # Зберігаємо відповідь для озвучування
-        if 'tts_cache' not in context.bot_data:
-            context.bot_data['tts_cache'] = {}
-
         cache_key = f"{user.id}_{update.message.message_id}"
-        context.bot_data['tts_cache'][cache_key] = response_text
+        get_tts_cache(context.bot_data).put(cache_key, response_text)
 
         # Логування для перевірки
         logger.info(f"Збережено в TTS кеш: {cache_key}, текст довжиною {len(response_text)} символів")
@@ -223,15 +185,13 @@ async def gpt_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        # Відправляємо відповідь з кнопками
-        await update.message.reply_text(response_text, reply_markup=reply_markup)
+        # Статусне повідомлення стає відповіддю з кнопками
+        await progress.finish(f"📝 Ти сказав: {text}\n\n{response_text}", reply_markup=reply_markup)
 
         logger.info(f"Відповідь надіслано користувачу {user.first_name} ({user.id})")
 
-        os.remove(voice_path)
-
     except Exception as e:
         logger.error(f"Помилка обробки голосу в /gpt: {str(e)}")
-        await update.message.reply_text(f"❌ Помилка обробки: {str(e)}")
+        await progress.finish(f"❌ Помилка обробки: {str(e)}")
 
     return WAITING_GPT_QUESTION
\ No newline at end of file
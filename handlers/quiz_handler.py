@@ -5,12 +5,55 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
-from utils.openai_helper import get_chatgpt_response
+from utils.openai_helper import get_chatgpt_response_async
+from utils.telegram_stream import ProgressMessage
 from utils.constants import CHOOSING_QUIZ_THEME, ANSWERING_QUIZ, QUIZ_THEMES
+from utils.quiz_bank import quiz_bank, generate_questions
+from utils.quiz_grader import grade_answer, local_resolution_rate, CORRECT, WRONG, UNCERTAIN
+from utils.image_registry import reply_menu_photo
 
 logger = logging.getLogger(__name__)
 
 
+async def refill_quiz_bank_job(context: ContextTypes.DEFAULT_TYPE):
+    """Фонове завдання job queue - поповнює банк питань для всіх тем"""
+    await quiz_bank.refill_all()
+
+
+def _schedule_refill(theme_key: str, context: ContextTypes.DEFAULT_TYPE):
+    """Запускає фонове поповнення теми, якщо черга опустилася нижче порогу"""
+    if not quiz_bank.needs_refill(theme_key) or quiz_bank.refilling(theme_key):
+        return
+    if context.job_queue:
+        context.job_queue.run_once(_refill_theme_job, 0, data=theme_key)
+    else:
+        context.application.create_task(quiz_bank.refill(theme_key))
+
+
+async def _refill_theme_job(context: ContextTypes.DEFAULT_TYPE):
+    """Разове фонове завдання - поповнює одну тему"""
+    await quiz_bank.refill(context.job.data)
+
+
+async def _next_question(theme_key: str, context: ContextTypes.DEFAULT_TYPE, progress: ProgressMessage):
+    """
+    Бере наступне питання з банку; якщо черга теми порожня - генерує одне напряму
+
+    Returns:
+        Словник {"question", "answer", "aliases"} або None, якщо генерація не вдалася
+    """
+    item = quiz_bank.take(theme_key)
+
+    if item is None:
+        await progress.stage("⏳ Генерую питання...")
+        generated = await generate_questions(theme_key, 1)
+        item = generated[0] if generated else None
+
+    _schedule_refill(theme_key, context)
+
+    return item
+
+
 async def quiz_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Початок квізу - вибір теми"""
     user = update.effective_user
@@ -28,18 +71,12 @@ async def quiz_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    try:
-        with open('images/quiz.jpg', 'rb') as photo:
-            await update.message.reply_photo(
-                photo=photo,
-                caption="🎮 Квіз!\n\nВибери тему для запитань:",
-                reply_markup=reply_markup
-            )
-    except FileNotFoundError:
-        await update.message.reply_text(
-            "🎮 Квіз!\n\nВибери тему для запитань:",
-            reply_markup=reply_markup
-        )
+    await reply_menu_photo(
+        update.message,
+        'images/quiz.jpg',
+        "🎮 Квіз!\n\nВибери тему для запитань:",
+        reply_markup=reply_markup
+    )
 
     return CHOOSING_QUIZ_THEME
 
@@ -62,17 +99,21 @@ async def quiz_choose_theme(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"Користувач {user.first_name} ({user.id}) вибрав тему {theme['name']}")
 
-    await query.message.reply_text("⏳ Генерую питання...")
+    progress = ProgressMessage(query.message)
+    item = await _next_question(theme_key, context, progress)
 
-    prompt = f"Придумай одне цікаве питання для квіза на тему '{theme['name']}'. Питання має бути середньої складності. Напиши лише саме запитання, без відповіді."
-    question = get_chatgpt_response(prompt)
+    if not item:
+        await progress.finish("😔 Не вдалося створити питання. Спробуй /quiz знову.")
+        return ConversationHandler.END
 
+    question = item['question']
+    context.user_data['quiz_current'] = item
     context.user_data['quiz_current_question'] = question
 
     score = context.user_data.get('quiz_score', 0)
     total = context.user_data.get('quiz_total', 0)
 
-    await query.message.reply_text(
+    await progress.finish(
         f"{theme['emoji']} Тема: {theme['name']}\n"
         f"📊 Рахунок: {score}/{total}\n\n"
         f"❓ Питання:\n{question}\n\n"
@@ -96,10 +137,32 @@ async def quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"Користувач {user.first_name} ({user.id}) відповів: {user_answer}")
 
-    await update.message.reply_text("⏳ Перевіряю відповідь...")
+    item = context.user_data.get('quiz_current') or {}
 
-    check_prompt = f"Питання квізу: {question}\nВідповідь користувача: {user_answer}\n\nПеревір, чи правильна відповідь. Відповідай ТІЛЬКИ 'Правильно' або 'Неправильно', а потім коротко поясни чому і дай правильну відповідь якщо потрібно."
-    result = get_chatgpt_response(check_prompt)
+    progress = ProgressMessage(update.message)
+
+    # Спочатку локальна перевірка за канонічною відповіддю
+    verdict = UNCERTAIN
+    if item.get('answer'):
+        verdict, similarity = grade_answer(user_answer, item['answer'], item.get('aliases'))
+        logger.info(f"Локальна перевірка: {verdict} (схожість {similarity:.2f}), "
+                    f"вирішено локально {local_resolution_rate():.0%}")
+
+    if verdict == CORRECT:
+        result = f"Правильно! Відповідь: {item['answer']}"
+    elif verdict == WRONG:
+        result = f"Неправильно. Правильна відповідь: {item['answer']}"
+    else:
+        # Сумнівний випадок - питаємо модель
+        await progress.stage("⏳ Перевіряю відповідь...")
+
+        reference = ""
+        if item.get('answer'):
+            aliases = ", ".join(item.get('aliases', []))
+            reference = f"Правильна відповідь: {item['answer']}" + (f" (також приймається: {aliases})" if aliases else "") + "\n"
+
+        check_prompt = f"Питання квізу: {question}\n{reference}Відповідь користувача: {user_answer}\n\nПеревір, чи правильна відповідь. Відповідай ТІЛЬКИ 'Правильно' або 'Неправильно', а потім коротко поясни чому і дай правильну відповідь якщо потрібно."
+        result = await get_chatgpt_response_async(check_prompt, task="quiz_grade")
 
     is_correct = result.lower().startswith("правильно")
 
@@ -122,7 +185,7 @@ async def quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    await update.message.reply_text(
+    await progress.finish(
         f"{emoji} {result}\n\n"
         f"📊 Поточний рахунок: {score}/{total}",
         reply_markup=reply_markup
@@ -148,17 +211,22 @@ async def quiz_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
         logger.info(f"Користувач {user.first_name} ({user.id}) хоче ще питання")
 
-        await query.message.reply_text("⏳ Генерую нове питання...")
+        theme_key = context.user_data.get('quiz_theme_key')
+        progress = ProgressMessage(query.message)
+        item = await _next_question(theme_key, context, progress)
 
-        prompt = f"Придумай одне цікаве питання для квіза на тему '{theme['name']}'. Питання має бути середньої складності. Напиши лише саме запитання, без відповіді."
-        question = get_chatgpt_response(prompt)
+        if not item:
+            await progress.finish("😔 Не вдалося створити питання. Спробуй ще раз.")
+            return ANSWERING_QUIZ
 
+        question = item['question']
+        context.user_data['quiz_current'] = item
         context.user_data['quiz_current_question'] = question
 
         score = context.user_data.get('quiz_score', 0)
         total = context.user_data.get('quiz_total', 0)
 
-        await query.message.reply_text(
+        await progress.finish(
             f"{theme['emoji']} Тема: {theme['name']}\n"
             f"📊 Рахунок: {score}/{total}\n\n"
             f"❓ Питання:\n{question}\n\n"
@@ -3,22 +3,66 @@
 """
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
 
-from utils.openai_helper import get_chatgpt_response
+from utils.openai_helper import get_chatgpt_response_async
+from utils.fact_pool import fact_pool
+from utils.telegram_stream import ProgressMessage
+from utils.image_registry import reply_menu_photo
 
 logger = logging.getLogger(__name__)
 
+FACT_PROMPT = "Розкажи один цікавий випадковий факт на будь-яку тему. Будь короткий (2-3 пропозиції) і цікавий."
+
+
+async def refill_fact_pool_job(context: ContextTypes.DEFAULT_TYPE):
+    """Фонове завдання job queue - поповнює пул фактів"""
+    if fact_pool.needs_refill:
+        await fact_pool.refill()
+
+
+def _schedule_refill(context: ContextTypes.DEFAULT_TYPE):
+    """Запускає фонове поповнення, якщо пул опустився нижче порогу"""
+    if not fact_pool.needs_refill or fact_pool.refilling:
+        return
+    if context.job_queue:
+        context.job_queue.run_once(refill_fact_pool_job, 0)
+    else:
+        context.application.create_task(fact_pool.refill())
+
+
+async def _next_fact(user_id: int, context: ContextTypes.DEFAULT_TYPE, progress: ProgressMessage) -> str:
+    """
+    Повертає факт з пулу миттєво; якщо пул порожній - генерує його напряму
+
+    Args:
+        user_id: ID користувача (для відстеження вже побачених фактів)
+        context: Контекст бота
+        progress: Статусне повідомлення, яке показує генерацію
+
+    Returns:
+        Текст факту
+    """
+    fact = fact_pool.take(user_id)
+
+    if fact is None:
+        await progress.stage("⏳ Генерую цікавий факт...")
+        fact = await get_chatgpt_response_async(FACT_PROMPT, task="random")
+        fact_pool.mark_seen(user_id, fact)
+
+    _schedule_refill(context)
+
+    return fact
+
 
 async def random_fact(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Надсилає випадковий факт від ChatGPT"""
     user = update.effective_user
     logger.info(f"Користувач {user.first_name} ({user.id}) натиснув /random")
 
-    await update.message.reply_text("⏳ Генерую цікавий факт...")
-
-    prompt = "Розкажи один цікавий випадковий факт на будь-яку тему. Будь короткий (2-3 пропозиції) і цікавий."
-    fact = get_chatgpt_response(prompt)
+    # Відповідь - фото, тому під час генерації показуємо лише дію чату
+    fact = await _next_fact(user.id, context, ProgressMessage(update.message, action=ChatAction.UPLOAD_PHOTO))
 
     keyboard = [
         [InlineKeyboardButton("🎲 Хочу ще факт", callback_data="random_more")],
@@ -26,18 +70,12 @@ async def random_fact(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    try:
-        with open('images/random.jpg', 'rb') as photo:
-            await update.message.reply_photo(
-                photo=photo,
-                caption=f"🎲 Випадковий факт:\n\n{fact}",
-                reply_markup=reply_markup
-            )
-    except FileNotFoundError:
-        await update.message.reply_text(
-            f"🎲 Випадковий факт:\n\n{fact}",
-            reply_markup=reply_markup
-        )
+    await reply_menu_photo(
+        update.message,
+        'images/random.jpg',
+        f"🎲 Випадковий факт:\n\n{fact}",
+        reply_markup=reply_markup
+    )
 
     logger.info(f"Факт надіслано користувачу {user.first_name} ({user.id})")
 
@@ -51,10 +89,8 @@ async def random_button_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if query.data == "random_more":
         logger.info(f"Користувач {user.first_name} ({user.id}) запросив ще факт")
 
-        await query.message.reply_text("⏳ Генерую ще один факт...")
-
-        prompt = "Розкажи один цікавий випадковий факт на будь-яку тему. Будь короткий (2-3 пропозиції) і цікавий."
-        fact = get_chatgpt_response(prompt)
+        progress = ProgressMessage(query.message)
+        fact = await _next_fact(user.id, context, progress)
 
         keyboard = [
             [InlineKeyboardButton("🎲 Хочу ще факт", callback_data="random_more")],
@@ -62,7 +98,7 @@ async def random_button_handler(update: Update, context: ContextTypes.DEFAULT_TY
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.message.reply_text(
+        await progress.finish(
             f"🎲 Випадковий факт:\n\n{fact}",
             reply_markup=reply_markup
         )
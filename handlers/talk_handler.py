@@ -5,8 +5,11 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
-from utils.openai_helper import get_chatgpt_response_with_history
+from utils.openai_helper import stream_chatgpt_response
+from utils.telegram_stream import ProgressMessage
+from utils.talk_history import TalkHistory
 from utils.constants import CHOOSING_PERSON, TALKING_WITH_PERSON, PERSONALITIES
+from utils.image_registry import reply_menu_photo
 
 logger = logging.getLogger(__name__)
 
@@ -25,18 +28,12 @@ async def talk_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    try:
-        with open('images/talk.jpg', 'rb') as photo:
-            await update.message.reply_photo(
-                photo=photo,
-                caption="🎭 Діалог з відомою особою\n\nВибери, з ким хочеш поговорити:",
-                reply_markup=reply_markup
-            )
-    except FileNotFoundError:
-        await update.message.reply_text(
-            "🎭 Діалог з відомою особою\n\nВибери, з ким хочеш поговорити:",
-            reply_markup=reply_markup
-        )
+    await reply_menu_photo(
+        update.message,
+        'images/talk.jpg',
+        "🎭 Діалог з відомою особою\n\nВибери, з ким хочеш поговорити:",
+        reply_markup=reply_markup
+    )
 
     return CHOOSING_PERSON
 
@@ -56,9 +53,7 @@ async def talk_choose_person(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     context.user_data['person'] = person
     context.user_data['person_key'] = person_key
-    context.user_data['conversation_history'] = [
-        {"role": "system", "content": person['prompt']}
-    ]
+    context.user_data['conversation_history'] = TalkHistory(person['prompt'])
 
     logger.info(f"Користувач {user.first_name} ({user.id}) вибрав {person['name']}")
 
@@ -81,32 +76,32 @@ async def talk_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_message = update.message.text
 
     person = context.user_data.get('person')
-    conversation_history = context.user_data.get('conversation_history', [])
+    conversation_history = context.user_data.get('conversation_history')
 
-    if not person:
+    if not person or not conversation_history:
         await update.message.reply_text("Помилка: особа не вибрана. Почни заново с /talk")
         return ConversationHandler.END
 
     logger.info(f"Користувач {user.first_name} ({user.id}) в діалозі з {person['name']}: {user_message}")
 
-    conversation_history.append({"role": "user", "content": user_message})
-
-    await update.message.reply_text("⏳ Думаю...")
-
-    response = get_chatgpt_response_with_history(conversation_history)
-
-    conversation_history.append({"role": "assistant", "content": response})
-
-    context.user_data['conversation_history'] = conversation_history
+    conversation_history.add("user", user_message)
 
     keyboard = [[InlineKeyboardButton("❌ Закінчити діалог", callback_data="talk_end")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    await update.message.reply_text(
-        f"{person['emoji']} {response}",
+    # Відповідь з'являється поступово в повідомленні-заглушці
+    response = await ProgressMessage(update.message).stream(
+        stream_chatgpt_response(conversation_history.messages(), task="talk"),
+        prefix=f"{person['emoji']} ",
         reply_markup=reply_markup
     )
 
+    conversation_history.add("assistant", response)
+
+    # Старі репліки згортаються в підсумок у фоні, не затримуючи відповідь
+    if conversation_history.needs_compaction:
+        context.application.create_task(conversation_history.compact())
+
     logger.info(f"Відповідь надіслано користувачу {user.first_name} ({user.id})")
 
     return TALKING_WITH_PERSON
@@ -3,12 +3,18 @@
 Обробник команди /translate - Перекладач
 """
 import logging
-import os
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ChatAction
 from telegram.ext import ContextTypes, ConversationHandler
 
-from utils.openai_helper import get_chatgpt_response, transcribe_audio, text_to_speech
+from utils.openai_helper import transcribe_audio_async, translate_multi_async
+from utils.translation_memory import translation_memory
+from utils.tts_cache import get_tts_cache
+from utils.tts_audio_cache import reply_tts_voice
+from utils.telegram_stream import ProgressMessage
+from utils.voice_io import downloaded_voice
 from utils.constants import CHOOSING_LANGUAGE, TRANSLATING, LANGUAGES
+from utils.image_registry import reply_menu_photo
 
 logger = logging.getLogger(__name__)
 
@@ -24,21 +30,16 @@ async def translate_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"{lang['emoji']} {lang['name']}",
             callback_data=f"lang_{key}"  # ← ВИПРАВЛЕНО! Було translate_lang_
         )])
+    keyboard.append([InlineKeyboardButton("🌐 Кілька мов одразу", callback_data="lang_multi")])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    try:
-        with open('images/translate.jpg', 'rb') as photo:
-            await update.message.reply_photo(
-                photo=photo,
-                caption="🌍 Перекладач\n\nВибери мову, якою потрібно перекласти:",
-                reply_markup=reply_markup
-            )
-    except FileNotFoundError:
-        await update.message.reply_text(
-            "🌍 Перекладач\n\nВибери мову, якою потрібно перекласти:",
-            reply_markup=reply_markup
-        )
+    await reply_menu_photo(
+        update.message,
+        'images/translate.jpg',
+        "🌍 Перекладач\n\nВибери мову, якою потрібно перекласти:",
+        reply_markup=reply_markup
+    )
 
     return CHOOSING_LANGUAGE
 
@@ -54,6 +55,7 @@ async def translate_choose_language(update: Update, context: ContextTypes.DEFAUL
 
     # Зберігаємо мову
     context.user_data['target_language'] = language_name
+    context.user_data.pop('target_languages', None)
 
     logger.info(f"Користувач {user.first_name} ({user.id}) вибрав мову {language_name}")
     logger.info(f"Збережено в context.user_data: {context.user_data}")
@@ -66,6 +68,94 @@ async def translate_choose_language(update: Update, context: ContextTypes.DEFAUL
     return TRANSLATING
 
 
+def _multi_language_keyboard(selected: list) -> InlineKeyboardMarkup:
+    """Клавіатура вибору кількох мов з позначками вибраних"""
+    keyboard = []
+    for key, lang in LANGUAGES.items():
+        mark = "✅" if key in selected else "▫️"
+        keyboard.append([InlineKeyboardButton(
+            f"{mark} {lang['emoji']} {lang['name']}",
+            callback_data=f"lang_toggle_{key}"
+        )])
+    keyboard.append([InlineKeyboardButton("➡️ Готово", callback_data="lang_done")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def translate_choose_multiple(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Вибір кількох мов для одночасного перекладу"""
+    query = update.callback_query
+    user = update.effective_user
+
+    selected = context.user_data.setdefault('multi_selection', [])
+
+    if query.data == "lang_multi":
+        selected.clear()
+        await query.answer()
+        await query.edit_message_reply_markup(reply_markup=_multi_language_keyboard(selected))
+        return CHOOSING_LANGUAGE
+
+    if query.data.startswith("lang_toggle_"):
+        language_code = query.data.replace("lang_toggle_", "")
+        if language_code in LANGUAGES:
+            if language_code in selected:
+                selected.remove(language_code)
+            else:
+                selected.append(language_code)
+        await query.answer()
+        await query.edit_message_reply_markup(reply_markup=_multi_language_keyboard(selected))
+        return CHOOSING_LANGUAGE
+
+    # lang_done
+    if not selected:
+        await query.answer("Вибери хоча б одну мову", show_alert=True)
+        return CHOOSING_LANGUAGE
+
+    await query.answer()
+
+    if len(selected) == 1:
+        context.user_data['target_language'] = LANGUAGES[selected[0]]["name"]
+        context.user_data.pop('target_languages', None)
+    else:
+        context.user_data['target_language'] = None
+        context.user_data['target_languages'] = list(selected)
+
+    names = ", ".join(f"{LANGUAGES[key]['emoji']} {LANGUAGES[key]['name']}" for key in selected)
+    logger.info(f"Користувач {user.first_name} ({user.id}) вибрав мови {names}")
+
+    await query.message.reply_text(
+        f"✅ Вибрано мови: {names}\n\n"
+        f"📝 Тепер надішліть текст або 🎤 голосове повідомлення для перекладу:"
+    )
+
+    return TRANSLATING
+
+
+async def _reply_multi_translation(progress: ProgressMessage, text: str, language_codes: list, header: str = ""):
+    """Перекладає текст на кілька мов одним запитом і показує все однією відповіддю"""
+    names = [LANGUAGES[key]["name"] for key in language_codes]
+    translations = await translate_multi_async(text, names)
+
+    keyboard = [
+        [InlineKeyboardButton("🔄 Ще переклад", callback_data="translate_continue")],
+        [InlineKeyboardButton("❌ Закінчити", callback_data="translate_end")]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    if translations is None:
+        await progress.finish(header + "❌ Помилка при перекладі. Спробуйте ще раз.", reply_markup=reply_markup)
+        return
+
+    parts = [
+        f"{LANGUAGES[key]['emoji']} {LANGUAGES[key]['name']}:\n{translations.get(LANGUAGES[key]['name']) or '—'}"
+        for key in language_codes
+    ]
+
+    await progress.finish(
+        header + "🌍 Переклад:\n\n" + "\n\n".join(parts),
+        reply_markup=reply_markup
+    )
+
+
 async def translate_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обробляє текстове повідомлення для перекладу"""
     user = update.effective_user
@@ -76,29 +166,31 @@ async def translate_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     target_language = context.user_data.get('target_language')
 
-    logger.info(f"target_language: {target_language}")
+    target_languages = context.user_data.get('target_languages')
 
-    if not target_language:
+    logger.info(f"target_language: {target_language or target_languages}")
+
+    if not target_language and not target_languages:
         await update.message.reply_text("❌ Помилка: мова не вибрана. Почніть знову з /translate")
         return ConversationHandler.END
 
-    logger.info(f"Переклад тексту від {user.first_name}: {user_text} -> {target_language}")
+    logger.info(f"Переклад тексту від {user.first_name}: {user_text} -> {target_language or target_languages}")
 
-    await update.message.reply_text("⏳ Перекладаю...")
+    progress = ProgressMessage(update.message)
+    await progress.stage("⏳ Перекладаю...")
 
     try:
-        # Формуємо промпт
-        prompt = f"Переклади наступний текст на {target_language}. Надай тільки переклад без пояснень:\n\n{user_text}"
+        # Кілька мов - один запит і одна відповідь
+        if target_languages:
+            await _reply_multi_translation(progress, user_text, target_languages)
+            return TRANSLATING
 
-        # Отримуємо переклад
-        translation = get_chatgpt_response(prompt)
+        # Отримуємо переклад (відомі речення беруться з пам'яті перекладів)
+        translation = await translation_memory.translate(user_text, target_language)
 
         # Зберігаємо в кеш для озвучування
-        if 'tts_cache' not in context.bot_data:
-            context.bot_data['tts_cache'] = {}
-
         cache_key = f"{user.id}_{update.message.message_id}"
-        context.bot_data['tts_cache'][cache_key] = translation
+        get_tts_cache(context.bot_data).put(cache_key, translation)
 
         logger.info(f"Збережено переклад в TTS кеш: {cache_key}")
 
@@ -112,8 +204,8 @@ async def translate_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        # Відправляємо з кнопками
-        await update.message.reply_text(
+        # Статусне повідомлення стає перекладом з кнопками
+        await progress.finish(
             f"🌍 Переклад:\n{translation}",
             reply_markup=reply_markup
         )
@@ -122,7 +214,7 @@ async def translate_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     except Exception as e:
         logger.error(f"Помилка перекладу: {e}")
-        await update.message.reply_text(f"❌ Помилка: {e}")
+        await progress.finish(f"❌ Помилка: {e}")
 
     return TRANSLATING
 
@@ -131,47 +223,40 @@ async def translate_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обробляє голосове повідомлення для перекладу"""
     user = update.effective_user
     target_language = context.user_data.get('target_language')
+    target_languages = context.user_data.get('target_languages')
 
-    if not target_language:
+    if not target_language and not target_languages:
         await update.message.reply_text("❌ Помилка: мова не вибрана. Почніть знову з /translate")
         return ConversationHandler.END
 
     logger.info(f"Користувач {user.first_name} ({user.id}) надіслав голос для перекладу")
 
-    await update.message.reply_text("🎤 Обробляю голосове повідомлення...")
+    progress = ProgressMessage(update.message)
+    await progress.stage("🎤 Обробляю голосове повідомлення...")
 
     try:
-        voice = update.message.voice
-        voice_file = await context.bot.get_file(voice.file_id)
-
-        os.makedirs("temp", exist_ok=True)
-
-        voice_path = f"temp/translate_voice_{user.id}.ogg"
-        await voice_file.download_to_drive(voice_path)
-
         # Розпізнаємо текст
-        text = transcribe_audio(voice_path)
+        async with downloaded_voice(context.bot, update.message.voice) as audio:
+            text = await transcribe_audio_async(audio)
 
         if text.startswith("Помилка"):
-            await update.message.reply_text(f"❌ {text}")
-            os.remove(voice_path)
+            await progress.finish(f"❌ {text}")
             return TRANSLATING
 
         logger.info(f"Розпізнаний текст: {text}")
-        await update.message.reply_text(f"📝 Ти сказав: {text}\n\n⏳ Перекладаю...")
+        header = f"📝 Ти сказав: {text}\n\n"
+        await progress.stage(header + "⏳ Перекладаю...")
 
-        # Формуємо промпт
-        prompt = f"Переклади наступний текст на {target_language}. Надай тільки переклад без пояснень:\n\n{text}"
+        if target_languages:
+            await _reply_multi_translation(progress, text, target_languages, header=header)
+            return TRANSLATING
 
-        # Отримуємо переклад
-        translation = get_chatgpt_response(prompt)
+        # Отримуємо переклад (відомі речення беруться з пам'яті перекладів)
+        translation = await translation_memory.translate(text, target_language)
 
         # Зберігаємо в кеш для озвучування
-        if 'tts_cache' not in context.bot_data:
-            context.bot_data['tts_cache'] = {}
-
         cache_key = f"{user.id}_{update.message.message_id}"
-        context.bot_data['tts_cache'][cache_key] = translation
+        get_tts_cache(context.bot_data).put(cache_key, translation)
 
         logger.info(f"Збережено переклад в TTS кеш: {cache_key}")
 
@@ -185,21 +270,17 @@ async def translate_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        # Відправляємо з кнопками
-        await update.message.reply_text(
-            f"🌍 Переклад:\n{translation}",
+        # Статусне повідомлення стає перекладом з кнопками
+        await progress.finish(
+            header + f"🌍 Переклад:\n{translation}",
             reply_markup=reply_markup
         )
 
         logger.info(f"Переклад голосу надіслано користувачу {user.first_name} ({user.id})")
 
-        os.remove(voice_path)
-
     except Exception as e:
         logger.error(f"Помилка обробки голосу для перекладу: {e}")
-        await update.message.reply_text(f"❌ Помилка: {e}")
-        if os.path.exists(voice_path):
-            os.remove(voice_path)
+        await progress.finish(f"❌ Помилка: {e}")
 
     return TRANSLATING
 
@@ -217,47 +298,33 @@ async def translate_button_handler(update: Update, context: ContextTypes.DEFAULT
     if query.data.startswith('tts_trans_'):
         cache_key = query.data.replace('tts_trans_', '')
 
-        tts_cache = context.bot_data.get('tts_cache', {})
+        tts_cache = get_tts_cache(context.bot_data)
 
-        if cache_key not in tts_cache:
+        text_to_voice = tts_cache.get(cache_key)
+
+        if text_to_voice is None:
             await query.message.reply_text("❌ Текст для озвучування не знайдено")
             return TRANSLATING
 
-        text_to_voice = tts_cache[cache_key]
-
-        await query.message.reply_text("🎙️ Створюю аудіо перекладу...")
+        # Замість статусного повідомлення - індикатор "записує аудіо"
+        await ProgressMessage(query.message).show_action(ChatAction.RECORD_VOICE)
 
-        output_path = f"temp/tts_trans_{user.id}_{cache_key}.mp3"
+        # Кнопки одразу під голосовим
+        keyboard = [
+            [InlineKeyboardButton("🔄 Ще переклад", callback_data="translate_continue")],
+            [InlineKeyboardButton("❌ Закінчити", callback_data="translate_end")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
 
         try:
-            os.makedirs("temp", exist_ok=True)
-
-            if text_to_speech(text_to_voice, output_path):
-                with open(output_path, 'rb') as audio_file:
-                    await query.message.reply_voice(voice=audio_file)
-
-                os.remove(output_path)
-                del tts_cache[cache_key]
-
-                # Кнопки після озвучування
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Ще переклад", callback_data="translate_continue")],
-                    [InlineKeyboardButton("❌ Закінчити", callback_data="translate_end")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                await query.message.reply_text(
-                    "🎙️ Озвучування завершено!\nЩо далі?",
-                    reply_markup=reply_markup
-                )
+            if await reply_tts_voice(query.message, text_to_voice, caption="🎙️ Що далі?", reply_markup=reply_markup):
+                tts_cache.pop(cache_key)
             else:
                 await query.message.reply_text("❌ Помилка при створенні аудіо")
 
         except Exception as e:
             logger.error(f"Помилка TTS в перекладі: {e}")
             await query.message.reply_text(f"❌ Помилка: {e}")
-            if os.path.exists(output_path):
-                os.remove(output_path)
 
         return TRANSLATING
 
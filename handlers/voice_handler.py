@@ -2,11 +2,14 @@
 Обробник голосових повідомлень (поза режимом перекладача)
 """
 import logging
-import os
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from utils.openai_helper import get_chatgpt_response, transcribe_audio, text_to_speech
+from utils.openai_helper import get_chatgpt_response_async, transcribe_audio_async
+from utils.telegram_media import TELEGRAM_CAPTION_LIMIT
+from utils.telegram_stream import ProgressMessage
+from utils.tts_audio_cache import reply_tts_voice
+from utils.voice_io import downloaded_voice
 
 logger = logging.getLogger(__name__)
 
@@ -16,47 +19,34 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     logger.info(f"Користувач {user.first_name} ({user.id}) надіслав голосове повідомлення")
 
-    await update.message.reply_text("🎤 Обробляю голосове повідомлення...")
+    progress = ProgressMessage(update.message)
+    await progress.stage("🎤 Обробляю голосове повідомлення...")
 
     try:
-        voice = update.message.voice
-        voice_file = await context.bot.get_file(voice.file_id)
-
-        os.makedirs("temp", exist_ok=True)
-
-        voice_path = f"temp/voice_{user.id}.ogg"
-        await voice_file.download_to_drive(voice_path)
-
-        logger.info(f"Голосове повідомлення збережене: {voice_path}")
-
-        text = transcribe_audio(voice_path)
+        async with downloaded_voice(context.bot, update.message.voice) as audio:
+            text = await transcribe_audio_async(audio)
 
         if text.startswith("Помилка"):
-            await update.message.reply_text(f"❌ {text}")
+            await progress.finish(f"❌ {text}")
             return
 
         logger.info(f"Розпізнаний текст: {text}")
-        await update.message.reply_text(f"📝 Ти сказав: {text}\n\n⏳ Генерую відповідь...")
+        await progress.stage(f"📝 Ти сказав: {text}\n\n⏳ Генерую відповідь...")
 
-        response = get_chatgpt_response(text)
+        response = await get_chatgpt_response_async(text)
 
-        audio_path = f"temp/response_{user.id}.mp3"
-
-        if text_to_speech(response, audio_path):
-            with open(audio_path, 'rb') as audio:
-                await update.message.reply_voice(
-                    voice=audio,
-                    caption=f"🤖 {response}"
-                )
+        # Статус з розпізнаним текстом залишаємо як є - відповідь приходить голосовим без зайвих запитів
+        # Довга відповідь не влазить у підпис - надсилаємо її окремим повідомленням
+        reply_text = f"🤖 {response}"
+        fits_caption = len(reply_text) <= TELEGRAM_CAPTION_LIMIT
 
+        if await reply_tts_voice(update.message, response, caption=reply_text if fits_caption else None):
+            if not fits_caption:
+                await update.message.reply_text(reply_text)
             logger.info(f"Голосова відповідь надіслано користувачу {user.first_name} ({user.id})")
-
-            os.remove(audio_path)
         else:
-            await update.message.reply_text(f"🤖 {response}")
-
-        os.remove(voice_path)
+            await update.message.reply_text(reply_text)
 
     except Exception as e:
         logger.error(f"Помилка обробки голосового повідомлення: {str(e)}")
-        await update.message.reply_text(f"❌ Помилка обробки: {str(e)}")
+        await progress.finish(f"❌ Помилка обробки: {str(e)}")
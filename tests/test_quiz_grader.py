@@ -0,0 +1,36 @@
+"""
+Регресійні випадки локальної перевірки відповідей квізу
+"""
+import pytest
+
+from utils.quiz_grader import grade_answer, CORRECT, WRONG, UNCERTAIN
+
+
+@pytest.mark.parametrize("user_answer, answer, aliases, expected", [
+    # Збіг з точністю до регістру, пунктуації та друкарських помилок
+    ("Париж", "Париж", None, CORRECT),
+    ("париж!", "Париж", None, CORRECT),
+    ("Це Париж", "Париж", None, CORRECT),
+    ("Ейнштейнн", "Ейнштейн", None, CORRECT),
+    ("Джоконда", "Мона Ліза", ["Джоконда"], CORRECT),
+    ("1945", "1945", None, CORRECT),
+    # Короткі слова мають збігатися точно
+    ("Крим", "Рим", None, UNCERTAIN),
+    ("Пириж", "Париж", None, UNCERTAIN),
+    # Заперечення та перелік варіантів вирішує модель
+    ("не Париж", "Париж", None, UNCERTAIN),
+    ("Лондон або Париж", "Париж", None, UNCERTAIN),
+    # Інше письмо або інша назва того самого - не можна відхилити локально
+    ("Sun", "Сонце", None, UNCERTAIN),
+    ("Джоконда", "Мона Ліза", None, UNCERTAIN),
+    # Числа: словами, зайві числа, явна розбіжність
+    ("сорок п'ятий", "1945", None, UNCERTAIN),
+    ("1944 або 1945", "1945", None, UNCERTAIN),
+    ("1944", "1945", None, WRONG),
+    # Явно інше слово тим самим письмом
+    ("Лондон", "Париж", None, WRONG),
+    ("Марс", "Венера", None, WRONG),
+])
+def test_grade_answer(user_answer, answer, aliases, expected):
+    verdict, _ = grade_answer(user_answer, answer, aliases)
+    assert verdict == expected
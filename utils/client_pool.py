@@ -0,0 +1,194 @@
+"""
+Пул клієнтів OpenAI для кількох API-ключів з вибором найменш завантаженого
+"""
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from config import KEY_COOLDOWN_RATE_LIMIT, KEY_COOLDOWN_AUTH
+from utils.proxy_pool import ProxyPool, ProxyEndpoint
+
+logger = logging.getLogger(__name__)
+
+
+def _mask(api_key: str) -> str:
+    """Безпечне ім'я ключа для логів і метрик"""
+    return f"...{api_key[-4:]}" if len(api_key) > 4 else "..."
+
+
+class PooledClient:
+    """Клієнт одного ключа зі станом здоров'я та лічильниками"""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self.name = _mask(api_key)
+        # Окремий клієнт для кожного маршруту (проксі), створюється при першому використанні
+        self._clients = {}
+
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.auth_errors = 0
+
+    def client_for(self, endpoint: ProxyEndpoint) -> AsyncOpenAI:
+        if endpoint.name not in self._clients:
+            self._clients[endpoint.name] = AsyncOpenAI(
+                api_key=self.api_key, http_client=endpoint.http_client, max_retries=0
+            )
+        return self._clients[endpoint.name]
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def cool_down(self, seconds: float, reason: str):
+        self.cooldown_until = time.monotonic() + seconds
+        logger.warning(f"OpenAI ключ {self.name} на паузі {seconds:.0f} с: {reason}")
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "auth_errors": self.auth_errors,
+        }
+
+
+class _Lease:
+    """Ключ і маршрут, зайняті одним запитом, до завершення відповіді"""
+
+    def __init__(self, pooled: PooledClient, endpoint: ProxyEndpoint):
+        self.pooled = pooled
+        self.endpoint = endpoint
+        self.client = pooled.client_for(endpoint)
+        self.released = False
+
+        pooled.in_flight += 1
+        pooled.requests += 1
+
+    def fail(self, error: BaseException):
+        """Оновлює стан ключа або маршруту за помилкою"""
+        pooled = self.pooled
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, httpx.TransportError)):
+            # Проблема маршруту, а не ключа - наступна спроба піде іншим проксі
+            pooled.failures += 1
+            self.endpoint.mark_failed(type(error).__name__)
+        elif isinstance(error, openai.RateLimitError):
+            pooled.failures += 1
+            pooled.rate_limited += 1
+            pooled.cool_down(KEY_COOLDOWN_RATE_LIMIT, "429 Too Many Requests")
+        elif isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+            pooled.failures += 1
+            pooled.auth_errors += 1
+            pooled.cool_down(KEY_COOLDOWN_AUTH, f"{error.status_code} помилка авторизації")
+        elif isinstance(error, openai.APIError):
+            pooled.failures += 1
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.pooled.in_flight -= 1
+
+
+class LeasedStream:
+    """
+    Потокова відповідь, що утримує ключ і маршрут, доки її не дочитано або не закрито
+
+    Помилки під час читання (обрив з'єднання, 429 всередині стріму) оновлюють
+    стан ключа та маршруту так само, як помилки відкриття запиту.
+    """
+
+    def __init__(self, stream, lease: _Lease):
+        self._stream = stream
+        self._lease = lease
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._lease.release()
+            raise
+        except BaseException as e:
+            self._lease.fail(e)
+            self._lease.release()
+            raise
+
+    async def close(self):
+        try:
+            await self._stream.close()
+        finally:
+            self._lease.release()
+
+
+class ClientPool:
+    """
+    Набір клієнтів OpenAI (по одному на ключ) поверх пулу проксі
+
+    Для кожного запиту вибирається здоровий ключ з найменшою кількістю
+    активних запитів (ключі, що повернули 429 або 401/403, тимчасово виключаються)
+    і найшвидший доступний маршрут з ProxyPool.
+    """
+
+    def __init__(self, api_keys: list, proxy_pool: ProxyPool):
+        self.proxy_pool = proxy_pool
+        self.clients = [PooledClient(api_key) for api_key in api_keys]
+
+    def _select(self) -> PooledClient:
+        healthy = [pooled for pooled in self.clients if pooled.healthy]
+        if healthy:
+            return min(healthy, key=lambda pooled: (pooled.in_flight, pooled.requests))
+        # Усі ключі на паузі - беремо той, що звільниться найраніше
+        return min(self.clients, key=lambda pooled: pooled.cooldown_until)
+
+    def _lease(self) -> _Lease:
+        return _Lease(self._select(), self.proxy_pool.select())
+
+    @asynccontextmanager
+    async def client(self):
+        """Видає клієнт для одного запиту і оновлює стан ключа за результатом"""
+        lease = self._lease()
+        try:
+            yield lease.client
+        except openai.APIError as e:
+            lease.fail(e)
+            raise
+        finally:
+            lease.release()
+
+    async def open_chat_stream(self, **params) -> LeasedStream:
+        """
+        Відкриває потокову chat completion; ключ і маршрут вважаються зайнятими до кінця стріму
+
+        Args:
+            **params: Параметри chat.completions.create (без stream)
+
+        Returns:
+            LeasedStream, який потрібно дочитати або закрити
+        """
+        lease = self._lease()
+        try:
+            stream = await lease.client.chat.completions.create(stream=True, **params)
+        except BaseException as e:
+            lease.fail(e)
+            lease.release()
+            raise
+        return LeasedStream(stream, lease)
+
+    async def close(self):
+        await self.proxy_pool.close()
+
+    def stats(self) -> dict:
+        """Використання та стан кожного ключа"""
+        return {pooled.name: pooled.stats() for pooled in self.clients}
@@ -0,0 +1,175 @@
+"""
+Пул заздалегідь згенерованих випадкових фактів для /random
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import deque
+
+from config import (
+    FACT_POOL_TARGET_SIZE, FACT_POOL_LOW_WATERMARK, FACT_POOL_BATCH_SIZE,
+    FACT_POOL_SEEN_PER_USER, FACT_POOL_FILE
+)
+from utils.openai_helper import get_chatgpt_json_async, task_max_tokens
+
+logger = logging.getLogger(__name__)
+
+FACTS_PROMPT = (
+    "Розкажи {count} різних цікавих випадкових фактів на різні теми. "
+    "Кожен факт - коротко (2-3 речення) і цікаво. "
+    'Відповідай JSON-об\'єктом у форматі {{"facts": ["факт 1", "факт 2", ...]}}.'
+)
+
+
+def _fact_hash(fact: str) -> str:
+    """Хеш нормалізованого тексту факту - для відстеження вже побачених"""
+    normalized = " ".join(fact.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class FactPool:
+    """
+    Черга готових фактів у пам'яті з фоновим поповненням пакетами
+
+    Факт видаляється з пулу, коли його показали користувачу. Факти, які
+    користувач уже бачив (модель інколи повторюється), пропускаються для нього
+    і залишаються для інших.
+    """
+
+    def __init__(self, target_size: int = FACT_POOL_TARGET_SIZE,
+                 low_watermark: int = FACT_POOL_LOW_WATERMARK,
+                 batch_size: int = FACT_POOL_BATCH_SIZE,
+                 seen_per_user: int = FACT_POOL_SEEN_PER_USER,
+                 path: str = FACT_POOL_FILE):
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.batch_size = batch_size
+        self.seen_per_user = seen_per_user
+        self.path = path
+
+        self._facts = deque()
+        # user_id -> (deque хешів у порядку показу, set тих самих хешів)
+        self._seen = {}
+        self._refill_lock = asyncio.Lock()
+
+        self.served = 0
+        self.empty_misses = 0
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    @property
+    def needs_refill(self) -> bool:
+        return len(self._facts) < self.low_watermark
+
+    @property
+    def refilling(self) -> bool:
+        return self._refill_lock.locked()
+
+    def _has_seen(self, user_id: int, fact_hash: str) -> bool:
+        seen = self._seen.get(user_id)
+        return seen is not None and fact_hash in seen[1]
+
+    def _mark_seen(self, user_id: int, fact_hash: str):
+        order, hashes = self._seen.setdefault(user_id, (deque(), set()))
+        order.append(fact_hash)
+        hashes.add(fact_hash)
+        if len(order) > self.seen_per_user:
+            hashes.discard(order.popleft())
+
+    def take(self, user_id: int):
+        """
+        Повертає факт, якого користувач ще не бачив, або None якщо такого немає
+        """
+        for index, fact in enumerate(self._facts):
+            fact_hash = _fact_hash(fact)
+            if not self._has_seen(user_id, fact_hash):
+                del self._facts[index]
+                self._mark_seen(user_id, fact_hash)
+                self.served += 1
+                return fact
+
+        self.empty_misses += 1
+        return None
+
+    def mark_seen(self, user_id: int, fact: str):
+        """Позначає факт як побачений (для фактів, згенерованих поза пулом)"""
+        self._mark_seen(user_id, _fact_hash(fact))
+
+    def add(self, facts: list) -> int:
+        """Додає нові факти, пропускаючи дублікати вже наявних у пулі"""
+        existing = {_fact_hash(fact) for fact in self._facts}
+        added = 0
+
+        for fact in facts:
+            if not isinstance(fact, str) or not fact.strip():
+                continue
+            fact_hash = _fact_hash(fact)
+            if fact_hash in existing:
+                continue
+            existing.add(fact_hash)
+            self._facts.append(fact.strip())
+            added += 1
+
+        return added
+
+    async def refill(self):
+        """Поповнює пул до target_size пакетними запитами (одночасно працює лише одне поповнення)"""
+        if self.refilling:
+            return
+
+        async with self._refill_lock:
+            attempts = 0
+            while len(self._facts) < self.target_size and attempts < 3:
+                attempts += 1
+                count = min(self.batch_size, self.target_size - len(self._facts))
+
+                data = await get_chatgpt_json_async(
+                    FACTS_PROMPT.format(count=count), task="random", max_tokens=task_max_tokens("random", items=count)
+                )
+                facts = data.get("facts", []) if isinstance(data, dict) else []
+
+                added = self.add(facts)
+                logger.info(f"Пул фактів поповнено на {added}, у пулі {len(self._facts)}")
+
+            self.save()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as pool_file:
+                self.add(json.load(pool_file))
+            logger.info(f"Пул фактів завантажено з {self.path}: {len(self._facts)}")
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.warning(f"Не вдалося прочитати пул фактів {self.path}: {e}")
+
+    def save(self):
+        """Зберігає пул на диск, якщо задано FACT_POOL_FILE"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as pool_file:
+            json.dump(list(self._facts), pool_file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        """Лічильники для діагностики"""
+        return {
+            "size": len(self._facts),
+            "served": self.served,
+            "empty_misses": self.empty_misses,
+            "users": len(self._seen),
+        }
+
+
+fact_pool = FactPool()
@@ -0,0 +1,146 @@
+"""
+Хеджування потокових запитів: другий однаковий запит, якщо перший токен затримується
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from config import HEDGE_PERCENTILE, HEDGE_MAX_RATE, HEDGE_DEFAULT_DELAY
+
+logger = logging.getLogger(__name__)
+
+# Скільки останніх вимірів зберігати і скільки потрібно для обчислення перцентиля
+WINDOW_SIZE = 200
+MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Ковзне вікно часу до першого токена (TTFT)"""
+
+    def __init__(self, size: int = WINDOW_SIZE):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float, default: float) -> float:
+        if len(self._samples) < MIN_SAMPLES:
+            return default
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Обмежує частку запитів, для яких запускається хедж"""
+
+    def __init__(self, max_rate: float = HEDGE_MAX_RATE, size: int = WINDOW_SIZE):
+        self.max_rate = max_rate
+        self._recent = deque(maxlen=size)
+
+    def record_request(self):
+        self._recent.append(0)
+
+    def try_hedge(self) -> bool:
+        """True, якщо хедж вкладається в бюджет (і враховує його)"""
+        if not self._recent or sum(self._recent) + 1 > self.max_rate * len(self._recent):
+            return False
+        self._recent[-1] = 1
+        return True
+
+
+ttft_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+hedge_stats = {"requests": 0, "hedged": 0, "hedge_won": 0}
+
+
+async def _first_token(open_stream):
+    """Відкриває стрім і чекає першого фрагмента тексту; повертає (стрім, текст)"""
+    stream = await open_stream()
+    try:
+        while True:
+            try:
+                chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, ""
+            if chunk.choices and chunk.choices[0].delta.content:
+                return stream, chunk.choices[0].delta.content
+    except BaseException:
+        # Скасований (програв хедж) або зламаний стрім закриваємо, щоб звільнити з'єднання
+        await stream.close()
+        raise
+
+
+async def _discard(task: asyncio.Task):
+    """Скасовує запит, що програв, і закриває його стрім"""
+    if not task.done():
+        task.cancel()
+    try:
+        stream, _ = await task
+    except BaseException:
+        return
+    await stream.close()
+
+
+async def open_stream_hedged(open_stream, hedge: bool = True):
+    """
+    Відкриває потокову відповідь; якщо перший токен не прийшов за поріг
+    (перцентиль HEDGE_PERCENTILE від спостережуваного TTFT), запускає другий
+    такий самий запит і бере той, що відповів першим
+
+    Args:
+        open_stream: Функція без аргументів, що повертає корутину відкриття стріму
+        hedge: Дозволити хеджування
+
+    Returns:
+        (стрім, перший фрагмент тексту)
+    """
+    started = time.monotonic()
+    hedge_stats["requests"] += 1
+    hedge_budget.record_request()
+
+    primary = asyncio.ensure_future(_first_token(open_stream))
+    secondary = None
+    winner = None
+
+    # На будь-якому виході (помилка, скасування виклику) запити, що не виграли, закриваються
+    try:
+        threshold = ttft_tracker.percentile(HEDGE_PERCENTILE, HEDGE_DEFAULT_DELAY)
+        done, _ = await asyncio.wait({primary}, timeout=threshold if hedge else None)
+
+        if done or not hedge_budget.try_hedge():
+            result = await primary
+            winner = primary
+            ttft_tracker.record(time.monotonic() - started)
+            return result
+
+        hedge_stats["hedged"] += 1
+        logger.info(f"Перший токен затримується понад {threshold:.2f} с - запускаю хедж-запит")
+        secondary = asyncio.ensure_future(_first_token(open_stream))
+
+        pending = {primary, secondary}
+        error = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    if winner is None:
+                        winner = task
+                else:
+                    error = task.exception()
+
+        if winner is None:
+            raise error or asyncio.CancelledError()
+
+        if winner is secondary:
+            hedge_stats["hedge_won"] += 1
+
+        ttft_tracker.record(time.monotonic() - started)
+        return winner.result()
+    finally:
+        for task in (primary, secondary):
+            if task is not None and task is not winner:
+                await _discard(task)
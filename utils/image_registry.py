@@ -0,0 +1,132 @@
+"""
+Реєстр зображень меню: кожне фото завантажується в Telegram один раз, далі надсилається за file_id
+"""
+import json
+import logging
+import os
+from telegram import Message
+from telegram.error import BadRequest
+
+from config import IMAGE_REGISTRY_FILE
+from utils.telegram_media import is_file_id_error, fit_caption
+
+logger = logging.getLogger(__name__)
+
+
+class ImageRegistry:
+    """
+    Зберігає file_id завантажених зображень (шлях -> file_id, розмір і час зміни файлу)
+
+    Реєстр зберігається на диск, тож після перезапуску фото не завантажуються повторно.
+    Якщо файл зображення змінився, він завантажується знову.
+    """
+
+    def __init__(self, path: str = IMAGE_REGISTRY_FILE):
+        self.path = path
+        self._entries = {}
+        self._loaded = False
+
+        self.file_id_hits = 0
+        self.uploads = 0
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as registry_file:
+                self._entries = json.load(registry_file)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as registry_file:
+            json.dump(self._entries, registry_file)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _signature(image_path: str):
+        """(розмір, час зміни) файлу або None, якщо файлу немає"""
+        try:
+            stat = os.stat(image_path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, int(stat.st_mtime)]
+
+    def get_file_id(self, image_path: str):
+        """file_id для зображення, якщо файл не змінився після завантаження"""
+        self._load()
+        entry = self._entries.get(image_path)
+        if not entry:
+            return None
+
+        signature = self._signature(image_path)
+        # Файл видалено з диска - file_id на серверах Telegram залишається валідним
+        if signature is not None and signature != entry.get("signature"):
+            return None
+        return entry["file_id"]
+
+    def set_file_id(self, image_path: str, file_id: str):
+        self._load()
+        self._entries[image_path] = {"file_id": file_id, "signature": self._signature(image_path)}
+        self._save()
+
+    def forget(self, image_path: str):
+        self._load()
+        if self._entries.pop(image_path, None) is not None:
+            self._save()
+
+    def stats(self) -> dict:
+        return {"images": len(self._entries), "file_id_hits": self.file_id_hits, "uploads": self.uploads}
+
+
+image_registry = ImageRegistry()
+
+
+async def reply_menu_photo(message: Message, image_path: str, caption: str, reply_markup=None) -> Message:
+    """
+    Відповідає фото меню з підписом
+
+    Порядок: file_id з реєстру -> завантаження файлу -> текст без фото, якщо файлу немає.
+
+    Args:
+        message: Повідомлення, на яке відповідаємо
+        image_path: Шлях до зображення (images/*.jpg)
+        caption: Підпис, обрізається до ліміту Telegram (або повний текст, якщо зображення недоступне)
+        reply_markup: Клавіатура (опціонально)
+
+    Returns:
+        Відправлене повідомлення
+    """
+    photo_caption = fit_caption(caption)
+
+    file_id = image_registry.get_file_id(image_path)
+    if file_id:
+        try:
+            sent = await message.reply_photo(photo=file_id, caption=photo_caption, reply_markup=reply_markup)
+            image_registry.file_id_hits += 1
+            return sent
+        except BadRequest as e:
+            if not is_file_id_error(e):
+                raise
+            logger.warning(f"Telegram відхилив file_id для {image_path}: {e}")
+            image_registry.forget(image_path)
+
+    try:
+        with open(image_path, "rb") as photo:
+            sent = await message.reply_photo(photo=photo, caption=photo_caption, reply_markup=reply_markup)
+    except FileNotFoundError:
+        return await message.reply_text(caption, reply_markup=reply_markup)
+
+    image_registry.uploads += 1
+    if sent.photo:
+        # Найбільший розмір фото - останній у списку
+        image_registry.set_file_id(image_path, sent.photo[-1].file_id)
+        logger.info(f"Зображення {image_path} завантажено, file_id збережено")
+
+    return sent
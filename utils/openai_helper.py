@@ -1,28 +1,236 @@
 
+import asyncio
+import hashlib
+import json
 import logging
-import httpx
-from openai import OpenAI
-from config import OPENAI_TOKEN, PROXY
+import time
+from config import OPENAI_TOKENS, PROXIES, HEDGE_ENABLED, OPENAI_CHAT_MODEL, TASK_PROFILES
+from utils.client_pool import ClientPool
+from utils.proxy_pool import ProxyPool
+from utils.response_cache import ResponseCache
+from utils.rate_governor import rate_governor
+from utils.request_context import current_user_id
+from utils.usage_tracker import usage_tracker
+from utils.work_lanes import text_lane, transcription_lane, synthesis_lane
+from utils.token_counter import estimate_tokens, estimate_messages_tokens
+from utils.resilience import call_with_retries
+from utils.hedging import open_stream_hedged
 
-# Ініціалізуємо клієнт OpenAI з проксі
-if PROXY:
-    # Якщо проксі є - використовуємо
-    http_client = httpx.Client(proxy=PROXY)
-    client = OpenAI(api_key=OPENAI_TOKEN, http_client=http_client)
-    logging.getLogger(__name__).info(f"OpenAI клієнт використовує проксі: {PROXY}")
-else:
-    # Якщо проксі немає - звичайне підключення
-    client = OpenAI(api_key=OPENAI_TOKEN)
-    logging.getLogger(__name__).info("OpenAI клієнт працює без проксі")
+# Параметри озвучування за замовчуванням
+TTS_MODEL = "tts-1"
+TTS_VOICE = "nova"
 
+# Профілі задач: модель, температура та бюджет токенів відповіді.
+# max_tokens - бюджет на один елемент відповіді (факт, питання, мову перекладу),
+# input_ratio - додаткові токени на кожен токен вхідного тексту (переклад пропорційний оригіналу),
+# max_tokens_limit - верхня межа. Перевизначаються змінною TASK_PROFILES без зміни коду.
+DEFAULT_TASK_PROFILES = {
+    "gpt": {"temperature": 0.7, "max_tokens": 1000},
+    "talk": {"temperature": 0.9, "max_tokens": 600},
+    "talk_summary": {"temperature": 0.3, "max_tokens": 500},
+    "random": {"temperature": 1.0, "max_tokens": 150},
+    "quiz_generate": {"temperature": 0.9, "max_tokens": 120},
+    "quiz_grade": {"temperature": 0.2, "max_tokens": 150},
+    "translate": {"temperature": 0.3, "max_tokens": 40, "input_ratio": 2.0},
+}
 
-def get_chatgpt_response(user_message: str, system_prompt: str = None) -> str:
+task_profiles = {
+    name: {
+        "model": OPENAI_CHAT_MODEL,
+        "input_ratio": 0.0,
+        "max_tokens_limit": 4000,
+        **DEFAULT_TASK_PROFILES.get(name, {}),
+        **TASK_PROFILES.get(name, {}),
+    }
+    for name in {**DEFAULT_TASK_PROFILES, **TASK_PROFILES}
+}
+
+
+def task_max_tokens(task: str, source_text: str = "", items: int = 1) -> int:
+    """
+    Обчислює max_tokens для задачі
+
+    Args:
+        task: Назва профілю задачі
+        source_text: Вхідний текст, від довжини якого залежить відповідь (для перекладу)
+        items: Кількість елементів у відповіді (фактів, питань, мов)
+
+    Returns:
+        Бюджет токенів відповіді
+    """
+    profile = task_profiles.get(task, task_profiles["gpt"])
+    per_item = profile["max_tokens"] + profile["input_ratio"] * estimate_tokens(source_text or "")
+    return min(int(per_item * max(items, 1)), profile["max_tokens_limit"])
+
+
+def _task_params(task: str, messages: list, temperature: float = None, max_tokens: int = None) -> dict:
+    """Параметри chat.completions для профілю задачі (явні temperature/max_tokens мають пріоритет)"""
+    profile = task_profiles.get(task, task_profiles["gpt"])
+    return {
+        "model": profile["model"],
+        "messages": messages,
+        "max_tokens": max_tokens if max_tokens is not None else task_max_tokens(task),
+        "temperature": temperature if temperature is not None else profile["temperature"],
+    }
+
+
+# Асинхронні клієнти (по одному на ключ) поверх пулу проксі з keep-alive з'єднаннями - не блокують event loop бота
+proxy_pool = ProxyPool(PROXIES)
+client_pool = ClientPool(OPENAI_TOKENS, proxy_pool)
+logging.getLogger(__name__).info(f"Пул OpenAI клієнтів: {len(OPENAI_TOKENS)} ключ(ів)")
+
+
+async def close_async_client():
+    """Закриває пул з'єднань асинхронних клієнтів (викликається при зупинці бота)"""
+    await client_pool.close()
+    response_cache.close()
+
+
+# Кеш відповідей для запитів, позначених як cacheable
+response_cache = ResponseCache()
+
+
+# Запити, що виконуються зараз: ключ -> asyncio.Task
+_in_flight = {}
+
+# upstream - реальні звернення до OpenAI, coalesced - запити, що приєдналися до вже активного
+single_flight_stats = {"upstream": 0, "coalesced": 0}
+
+
+def _request_key(kind: str, params: dict) -> str:
+    """Хеш від типу запиту, моделі, повідомлень і параметрів"""
+    payload = json.dumps([kind, params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _single_flight(key: str, factory):
+    """
+    Об'єднує однакові одночасні запити: до OpenAI йде лише один, результат отримують усі
+
+    Запит виконується окремою задачею, тож скасування одного з очікувачів
+    не перериває його для інших.
+    """
+    task = _in_flight.get(key)
+
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _in_flight[key] = task
+        single_flight_stats["upstream"] += 1
+
+        def _done(finished):
+            if _in_flight.get(key) is finished:
+                del _in_flight[key]
+            if not finished.cancelled():
+                finished.exception()  # позначаємо виняток як отриманий
+
+        task.add_done_callback(_done)
+    else:
+        single_flight_stats["coalesced"] += 1
+        logging.getLogger(__name__).info(
+            f"Запит об'єднано з активним (всього об'єднано: {single_flight_stats['coalesced']})"
+        )
+
+    return await asyncio.shield(task)
+
+
+async def _acquire(model: str, tokens: int = 0):
+    """Чекає дозволу регулятора; запити понад денний бюджет користувача йдуть після інших"""
+    user_id = current_user_id.get()
+    await rate_governor.acquire(model, user_id, tokens, low_priority=usage_tracker.over_budget(user_id, tokens))
+
+
+async def _acquire_chat(params: dict):
+    """Чекає дозволу регулятора: оцінка = токени промпту + max_tokens відповіді"""
+    tokens = estimate_messages_tokens(params["messages"]) + params.get("max_tokens", 0)
+    await _acquire(params["model"], tokens)
+
+
+def _normalize_text(text: str) -> str:
+    """Прибирає зайві пробіли, зберігаючи переноси рядків"""
+    lines = (" ".join(line.split()) for line in text.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _normalize_messages(messages: list) -> list:
+    """Нормалізує тексти повідомлень (для ключа кешу)"""
+    return [
+        {**message, "content": _normalize_text(str(message.get("content") or ""))}
+        for message in messages
+    ]
+
+
+def _record_usage(task: str, usage, started: float):
+    """Записує фактичні токени з відповіді API в облік користувача та режиму"""
+    if usage is None:
+        return
+    usage_tracker.record(
+        current_user_id.get(), task, usage.prompt_tokens, usage.completion_tokens, time.monotonic() - started
+    )
+
+
+async def _chat_completion(cacheable: bool = False, task: str = "gpt", validate=None, **params) -> str:
+    """
+    Chat completion з об'єднанням однакових одночасних запитів; повертає текст відповіді
+
+    Args:
+        cacheable: Зберігати відповідь у response_cache (для детермінованих запитів)
+        task: Профіль задачі (для обліку токенів)
+        validate: Перевірка тексту відповіді перед кешуванням (опціонально)
+        **params: Параметри chat.completions.create
+    """
+    cache_key = None
+    if cacheable:
+        cache_key = _request_key("chat", {**params, "messages": _normalize_messages(params["messages"])})
+        cached = response_cache.get(cache_key)
+        if cached is not None and (validate is None or validate(cached)):
+            return cached
+
+    async def _attempt():
+        started = time.monotonic()
+        async with client_pool.client() as openai_client:
+            response = await openai_client.chat.completions.create(**params)
+        _record_usage(task, response.usage, started)
+        choice = response.choices[0]
+        return choice.message.content, choice.finish_reason
+
+    async def _call():
+        # Слот текстової смуги - лише на час спроби, не на очікування регулятора і паузи повторів
+        return await call_with_retries(
+            _attempt,
+            before_attempt=lambda: _acquire_chat(params),
+            slot=lambda: text_lane.slot(current_user_id.get())
+        )
+
+    try:
+        content, finish_reason = await _single_flight(_request_key("chat", params), _call)
+    except Exception:
+        # Upstream недоступний - віддаємо застарілу відповідь з кешу, якщо вона є
+        stale = response_cache.get(cache_key, allow_stale=True) if cache_key else None
+        if stale is not None and (validate is None or validate(stale)):
+            logging.getLogger(__name__).warning("OpenAI недоступний, використано застарілу відповідь з кешу")
+            return stale
+        raise
+
+    # Обрізана лімітом max_tokens або невалідна відповідь не кешується - наступний запит спробує знову
+    if cache_key and content and finish_reason != "length" and (validate is None or validate(content)):
+        response_cache.put(cache_key, content)
+
+    return content
+
+
+async def get_chatgpt_response_async(user_message: str, system_prompt: str = None,
+                                     temperature: float = None, cacheable: bool = False,
+                                     task: str = "gpt", max_tokens: int = None) -> str:
     """
-    Надсилає запит до ChatGPT і повертає відповідь
+    Надсилає запит до ChatGPT і повертає відповідь, не блокуючи event loop
 
     Args:
         user_message: Повідомлення користувача
         system_prompt: Системний промпт (опціонально)
+        temperature: Температура генерації (за замовчуванням - з профілю задачі)
+        cacheable: Кешувати відповідь (лише для детермінованих запитів з низькою температурою)
+        task: Профіль задачі (модель, температура, max_tokens)
+        max_tokens: Максимальна кількість токенів відповіді (за замовчуванням - з профілю задачі)
 
     Returns:
         Відповідь від ChatGPT
@@ -35,94 +243,244 @@ def get_chatgpt_response(user_message: str, system_prompt: str = None) -> str:
 
         messages.append({"role": "user", "content": user_message})
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            max_tokens=1000,
-            temperature=0.7
+        return await _chat_completion(
+            cacheable=cacheable,
+            task=task,
+            **_task_params(task, messages, temperature, max_tokens)
         )
 
-        return response.choices[0].message.content
-
     except Exception as e:
         logger = logging.getLogger(__name__)
         logger.error(f"Помилка OpenAI API: {str(e)}")
         return "Вибачте, виникла помилка при зверненні до ChatGPT. Спробуйте пізніше."
 
 
-def get_chatgpt_response_with_history(messages: list) -> str:
+async def translate_text_async(text: str, target_language: str) -> str:
+    """
+    Перекладає текст (відповіді кешуються за нормалізованим текстом і мовою)
+
+    Args:
+        text: Текст для перекладу
+        target_language: Назва мови перекладу (з LANGUAGES)
+
+    Returns:
+        Переклад
+    """
+    text = _normalize_text(text)
+    prompt = f"Переклади наступний текст на {target_language}. Надай тільки переклад без пояснень:\n\n{text}"
+    return await get_chatgpt_response_async(
+        prompt, cacheable=True, task="translate", max_tokens=task_max_tokens("translate", text)
+    )
+
+
+async def stream_chatgpt_response(messages: list, temperature: float = None, hedge: bool = HEDGE_ENABLED,
+                                  task: str = "gpt"):
     """
-    Відправляє запит у ChatGPT з історією діалогу
+    Потокова відповідь ChatGPT - повертає текст частинами в міру генерації
 
     Args:
         messages: Список повідомлень у форматі [{"role": "...", "content": "..."}]
+        temperature: Температура генерації (за замовчуванням - з профілю задачі)
+        hedge: Дублювати запит, якщо перший токен затримується (utils/hedging)
+        task: Профіль задачі (модель, температура, max_tokens)
+
+    Yields:
+        Фрагменти (дельти) тексту відповіді
+    """
+    produced = False
+    try:
+        params = _task_params(task, messages, temperature)
+
+        async def _open_stream():
+            return await client_pool.open_chat_stream(stream_options={"include_usage": True}, **params)
+
+        # Слот текстової смуги зайнятий, доки стрім не дочитано
+        async with text_lane.slot(current_user_id.get()):
+            started = time.monotonic()
+            # Повтори та хедж можливі лише до першого токена
+            stream, first_text = await open_stream_hedged(
+                lambda: call_with_retries(_open_stream, before_attempt=lambda: _acquire_chat(params)),
+                hedge=hedge
+            )
+
+            try:
+                if first_text:
+                    produced = True
+                    yield first_text
+
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        produced = True
+                        yield chunk.choices[0].delta.content
+                    # Останній фрагмент містить лише usage
+                    if chunk.usage:
+                        _record_usage(task, chunk.usage, started)
+            finally:
+                # Звільняємо ключ і з'єднання, навіть якщо споживач перестав читати
+                await stream.close()
+
+    except Exception as e:
+        logger = logging.getLogger(__name__)
+        logger.error(f"Помилка потокової відповіді OpenAI API: {str(e)}")
+        # Якщо частина відповіді вже показана - залишаємо її як є
+        if not produced:
+            yield "Вибачте, виникла помилка при зверненні до ChatGPT. Спробуйте пізніше."
+
+
+async def get_chatgpt_json_async(prompt: str, system_prompt: str = None,
+                                 temperature: float = None, max_tokens: int = None,
+                                 cacheable: bool = False, task: str = "gpt", validate=None):
+    """
+    Запит до ChatGPT зі структурованою відповіддю у форматі JSON-об'єкта
+
+    Args:
+        prompt: Запит (має описувати очікувану структуру JSON)
+        system_prompt: Системний промпт (опціонально)
+        temperature: Температура генерації (за замовчуванням - з профілю задачі)
+        max_tokens: Максимальна кількість токенів відповіді (за замовчуванням - з профілю задачі)
+        cacheable: Кешувати відповідь (лише для детермінованих запитів)
+        task: Профіль задачі (модель, температура, max_tokens)
+        validate: Перевірка розібраного JSON; у кеш потрапляє лише відповідь, що її пройшла
 
     Returns:
-        Відповідь від ChatGPT
+        Розібраний JSON (dict) або None, якщо помилка
     """
+    def _is_valid(content: str) -> bool:
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return False
+        return validate is None or validate(data)
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            max_tokens=1000,
-            temperature=0.9
+        messages = []
+
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        messages.append({"role": "user", "content": prompt})
+
+        content = await _chat_completion(
+            cacheable=cacheable,
+            task=task,
+            validate=_is_valid,
+            response_format={"type": "json_object"},
+            **_task_params(task, messages, temperature, max_tokens)
         )
 
-        return response.choices[0].message.content
+        return json.loads(content)
 
     except Exception as e:
         logger = logging.getLogger(__name__)
-        logger.error(f"Помилка OpenAI API з історією: {str(e)}")
-        return "Вибачте, виникла помилка при зверненні до ChatGPT. Спробуйте пізніше."
+        logger.error(f"Помилка OpenAI API (JSON): {str(e)}")
+        return None
 
 
-def transcribe_audio(audio_file_path: str) -> str:
+def _has_translations(data) -> bool:
+    """Відповідь мультиперекладу містить словник translations"""
+    return isinstance(data, dict) and isinstance(data.get("translations"), dict)
+
+
+async def translate_multi_async(text: str, target_languages: list):
     """
-    Перетворює аудіо на текст за допомогою Whisper API
+    Перекладає текст одразу на кілька мов одним запитом
 
     Args:
-        audio_file_path: Шлях до аудіофайлу
+        text: Текст для перекладу
+        target_languages: Назви мов перекладу (з LANGUAGES)
+
+    Returns:
+        Словник {назва мови: переклад} або None, якщо помилка
+    """
+    text = _normalize_text(text)
+    languages = ", ".join(target_languages)
+    example = ", ".join(f'"{language}": "..."' for language in target_languages)
+    prompt = (
+        f"Переклади наступний текст на кожну з мов: {languages}. Надай тільки переклади без пояснень. "
+        f"Відповідай JSON-об'єктом у форматі {{\"translations\": {{{example}}}}}.\n\n{text}"
+    )
+
+    data = await get_chatgpt_json_async(
+        prompt, cacheable=True, task="translate",
+        max_tokens=task_max_tokens("translate", text, items=len(target_languages)),
+        validate=_has_translations
+    )
+
+    if not _has_translations(data):
+        return None
+    translations = data["translations"]
+
+    return {language: str(translations.get(language) or "").strip() for language in target_languages}
+
+
+async def transcribe_audio_async(audio, filename: str = "voice.ogg") -> str:
+    """
+    Перетворює аудіо на текст за допомогою Whisper API, працює з буфером у пам'яті
+
+    Args:
+        audio: Файлоподібний об'єкт з аудіо (BytesIO, SpooledTemporaryFile) або байти
+        filename: Ім'я файлу для визначення формату на боці OpenAI
 
     Returns:
         Розпізнаний текст
     """
     try:
-        with open(audio_file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="ru"
-            )
+        async def _attempt():
+            if hasattr(audio, "seek"):
+                audio.seek(0)
+
+            async with client_pool.client() as openai_client:
+                return await openai_client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=(filename, audio),
+                    language="ru"
+                )
+
+        # Whisper працює у власній смузі і не займає слоти текстових запитів
+        transcript = await call_with_retries(
+            _attempt,
+            before_attempt=lambda: _acquire("whisper-1"),
+            slot=lambda: transcription_lane.slot(current_user_id.get())
+        )
         return transcript.text
-    except FileNotFoundError:
-        return "Помилка: аудіофайл не знайдено"
     except Exception as e:
         logger = logging.getLogger(__name__)
         logger.error(f"Помилка Whisper API: {str(e)}")
         return "Вибачте, не вдалося розпізнати аудіо. Спробуйте ще раз."
 
 
-def text_to_speech(text: str, output_path: str) -> bool:
+async def synthesize_speech_async(text: str, model: str = TTS_MODEL, voice: str = TTS_VOICE):
     """
-    Перетворює текст на мову за допомогою TTS API
+    Генерує аудіо (MP3) за допомогою TTS API і повертає його байти
 
     Args:
         text: Текст для озвучення
-        output_path: Шлях для збереження аудіофайлу
+        model: Модель TTS
+        voice: Голос
 
     Returns:
-        True якщо успішно, False якщо помилка
+        Байти аудіо або None, якщо помилка
     """
     try:
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=text
-        )
+        async def _attempt():
+            async with client_pool.client() as openai_client:
+                response = await openai_client.audio.speech.create(
+                    model=model,
+                    voice=voice,
+                    input=text
+                )
+            return response.content
+
+        async def _call():
+            return await call_with_retries(
+                _attempt,
+                before_attempt=lambda: _acquire(model),
+                slot=lambda: synthesis_lane.slot(current_user_id.get())
+            )
 
-        response.stream_to_file(output_path)
-        return True
+        params = {"model": model, "voice": voice, "input": text}
+        return await _single_flight(_request_key("speech", params), _call)
     except Exception as e:
         logger = logging.getLogger(__name__)
         logger.error(f"Помилка TTS API: {str(e)}")
-        return False
+        return None
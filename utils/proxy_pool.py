@@ -0,0 +1,118 @@
+"""
+Пул проксі для OpenAI: перевірка доступності, EWMA затримки та вибір найшвидшого
+"""
+import asyncio
+import logging
+import time
+
+import httpx
+
+from config import (
+    OPENAI_MAX_CONNECTIONS, OPENAI_TIMEOUT, PROXY_PROBE_URL, PROXY_PROBE_TIMEOUT, PROXY_EWMA_ALPHA
+)
+
+logger = logging.getLogger(__name__)
+
+# Затримка, яку вважаємо для проксі без жодного виміру (сек)
+UNKNOWN_LATENCY = 1.0
+
+
+def _mask(proxy: str) -> str:
+    """Адреса проксі без логіна/пароля"""
+    if not proxy:
+        return "direct"
+    return proxy.split("@")[-1]
+
+
+class ProxyEndpoint:
+    """Один маршрут до OpenAI (через проксі або напряму) з власним пулом keep-alive з'єднань"""
+
+    def __init__(self, proxy: str = None):
+        self.proxy = proxy
+        self.name = _mask(proxy)
+        self.http_client = httpx.AsyncClient(
+            proxy=proxy,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=10.0)
+        )
+
+        self.latency = None
+        self.healthy = True
+        self.failures = 0
+        self.requests = 0
+
+    def record_latency(self, seconds: float):
+        """Оновлює EWMA затримки"""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = PROXY_EWMA_ALPHA * seconds + (1 - PROXY_EWMA_ALPHA) * self.latency
+
+    def mark_healthy(self):
+        if not self.healthy:
+            logger.info(f"Проксі {self.name} знову доступний")
+        self.healthy = True
+
+    def mark_failed(self, reason: str):
+        self.failures += 1
+        if self.healthy:
+            logger.warning(f"Проксі {self.name} недоступний: {reason}")
+        self.healthy = False
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "latency": self.latency,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class ProxyPool:
+    """
+    Набір маршрутів до OpenAI
+
+    Для кожного запиту вибирається доступний маршрут з найменшою EWMA затримкою;
+    маршрут, що дав помилку з'єднання, виключається до наступної успішної перевірки.
+    """
+
+    def __init__(self, proxies: list):
+        self.endpoints = [ProxyEndpoint(proxy) for proxy in (proxies or [None])]
+
+    def select(self) -> ProxyEndpoint:
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        candidates = healthy or self.endpoints
+        endpoint = min(
+            candidates,
+            key=lambda item: item.latency if item.latency is not None else UNKNOWN_LATENCY
+        )
+        endpoint.requests += 1
+        return endpoint
+
+    async def _probe(self, endpoint: ProxyEndpoint):
+        started = time.monotonic()
+        try:
+            # Будь-яка HTTP-відповідь (навіть 401 без ключа) означає, що маршрут працює
+            await endpoint.http_client.get(PROXY_PROBE_URL, timeout=PROXY_PROBE_TIMEOUT)
+        except httpx.HTTPError as e:
+            endpoint.mark_failed(f"{type(e).__name__}")
+            return
+        endpoint.record_latency(time.monotonic() - started)
+        endpoint.mark_healthy()
+
+    async def probe_all(self):
+        """Перевіряє всі маршрути паралельно"""
+        if len(self.endpoints) < 2:
+            return
+        await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+        logger.info(f"Стан проксі: {self.stats()}")
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.http_client.aclose()
+
+    def stats(self) -> dict:
+        return {endpoint.name: endpoint.stats() for endpoint in self.endpoints}
@@ -0,0 +1,156 @@
+"""
+Банк питань квізу з канонічними відповідями для кожної теми
+"""
+import asyncio
+import hashlib
+import logging
+from collections import deque
+
+from config import QUIZ_BANK_TARGET_SIZE, QUIZ_BANK_LOW_WATERMARK, QUIZ_BANK_BATCH_SIZE
+from utils.constants import QUIZ_THEMES
+from utils.openai_helper import get_chatgpt_json_async, task_max_tokens
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_PROMPT = (
+    "Придумай {count} різних цікавих питань для квіза на тему '{theme}'. "
+    "Питання мають бути середньої складності і мати одну коротку однозначну відповідь "
+    "(ім'я, назва, число, дата або кілька слів). "
+    "Для кожного питання дай канонічну відповідь і список допустимих варіантів її написання "
+    "(синоніми, скорочення, написання іншими мовами). "
+    'Відповідай JSON-об\'єктом у форматі {{"questions": [{{"question": "...", "answer": "...", "aliases": ["..."]}}]}}.'
+)
+
+
+def _question_hash(question: str) -> str:
+    normalized = " ".join(question.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def parse_questions(data) -> list:
+    """
+    Перевіряє структуровану відповідь моделі і повертає список питань
+
+    Returns:
+        Список словників {"question": str, "answer": str, "aliases": [str]}
+    """
+    items = data.get("questions", []) if isinstance(data, dict) else []
+    questions = []
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        question = str(item.get("question") or "").strip()
+        answer = str(item.get("answer") or "").strip()
+        if not question or not answer:
+            continue
+        aliases = item.get("aliases") or []
+        if not isinstance(aliases, list):
+            aliases = [aliases]
+        questions.append({
+            "question": question,
+            "answer": answer,
+            "aliases": [str(alias).strip() for alias in aliases if str(alias).strip()],
+        })
+
+    return questions
+
+
+async def generate_questions(theme_key: str, count: int) -> list:
+    """Генерує пакет питань для теми одним запитом"""
+    theme = QUIZ_THEMES[theme_key]
+    data = await get_chatgpt_json_async(
+        QUESTIONS_PROMPT.format(count=count, theme=theme['name']),
+        task="quiz_generate",
+        max_tokens=task_max_tokens("quiz_generate", items=count)
+    )
+    return parse_questions(data)[:count]
+
+
+class QuizBank:
+    """
+    Черги готових питань для кожної теми з QUIZ_THEMES
+
+    Видача наступного питання - локальна операція; черги поповнюються
+    пакетною генерацією у фоні.
+    """
+
+    def __init__(self, target_size: int = QUIZ_BANK_TARGET_SIZE,
+                 low_watermark: int = QUIZ_BANK_LOW_WATERMARK,
+                 batch_size: int = QUIZ_BANK_BATCH_SIZE):
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.batch_size = batch_size
+
+        self._questions = {key: deque() for key in QUIZ_THEMES}
+        self._locks = {key: asyncio.Lock() for key in QUIZ_THEMES}
+
+        self.served = 0
+        self.empty_misses = 0
+
+    def size(self, theme_key: str) -> int:
+        return len(self._questions.get(theme_key, ()))
+
+    def needs_refill(self, theme_key: str) -> bool:
+        return self.size(theme_key) < self.low_watermark
+
+    def refilling(self, theme_key: str) -> bool:
+        return self._locks[theme_key].locked()
+
+    def take(self, theme_key: str):
+        """Повертає наступне питання теми або None, якщо черга порожня"""
+        questions = self._questions.get(theme_key)
+
+        if not questions:
+            self.empty_misses += 1
+            return None
+
+        self.served += 1
+        return questions.popleft()
+
+    def add(self, theme_key: str, questions: list) -> int:
+        """Додає питання до черги теми, пропускаючи дублікати"""
+        queue = self._questions[theme_key]
+        existing = {_question_hash(item["question"]) for item in queue}
+        added = 0
+
+        for item in questions:
+            question_hash = _question_hash(item["question"])
+            if question_hash in existing:
+                continue
+            existing.add(question_hash)
+            queue.append(item)
+            added += 1
+
+        return added
+
+    async def refill(self, theme_key: str):
+        """Поповнює чергу теми до target_size (одночасно - одне поповнення на тему)"""
+        lock = self._locks[theme_key]
+        if lock.locked():
+            return
+
+        async with lock:
+            attempts = 0
+            while self.size(theme_key) < self.target_size and attempts < 3:
+                attempts += 1
+                count = min(self.batch_size, self.target_size - self.size(theme_key))
+                added = self.add(theme_key, await generate_questions(theme_key, count))
+                logger.info(f"Банк питань '{theme_key}' поповнено на {added}, у черзі {self.size(theme_key)}")
+
+    async def refill_all(self):
+        """Поповнює всі теми, що опустилися нижче порогу"""
+        await asyncio.gather(*(
+            self.refill(theme_key) for theme_key in QUIZ_THEMES if self.needs_refill(theme_key)
+        ))
+
+    def stats(self) -> dict:
+        """Лічильники для діагностики"""
+        return {
+            "sizes": {key: len(queue) for key, queue in self._questions.items()},
+            "served": self.served,
+            "empty_misses": self.empty_misses,
+        }
+
+
+quiz_bank = QuizBank()
@@ -0,0 +1,190 @@
+"""
+Локальна перевірка відповідей квізу з переходом до моделі лише для сумнівних випадків
+"""
+import logging
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+logger = logging.getLogger(__name__)
+
+# Результати локальної перевірки
+CORRECT = "correct"
+WRONG = "wrong"
+UNCERTAIN = "uncertain"
+
+# Правильно - лише якщо вся відповідь відрізняється від еталону не більше ніж на кілька
+# друкарських помилок (допуск росте з довжиною слова). Неправильно - лише однослівна відповідь
+# тим самим письмом, що й однослівний еталон, зі схожістю нижче WRONG_THRESHOLD: переклад
+# ("Sun" / "Сонце") чи інша назва ("Джоконда" / "Мона Ліза") вирішує модель
+WRONG_THRESHOLD = 0.5
+
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "ґ": "g", "д": "d", "е": "e", "є": "ye", "ё": "yo",
+    "ж": "zh", "з": "z", "и": "i", "і": "i", "ї": "yi", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh",
+    "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e",
+    "ю": "yu", "я": "ya",
+}
+
+STOPWORDS = {
+    "це", "мабуть", "напевно", "думаю", "відповідь", "можливо", "був", "була", "було", "the", "a", "an",
+    "is", "it", "это", "наверное", "ответ",
+}
+
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+# Лічильники: скільки відповідей вирішено локально, а скільки передано моделі
+grading_stats = {CORRECT: 0, WRONG: 0, UNCERTAIN: 0}
+
+
+def normalize(text: str) -> str:
+    """Нижній регістр, без діакритики, пунктуації та слів-заповнювачів"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace("'", "").replace("’", "").replace("ʼ", "").replace("`", "")
+    text = re.sub(r"[^\w\s.,]", " ", text)
+    text = re.sub(r"(?<!\d)[.,]|[.,](?!\d)", " ", text)
+    words = [word for word in text.split() if word not in STOPWORDS]
+    return " ".join(words)
+
+
+def transliterate(text: str) -> str:
+    """Кирилиця -> латиниця (щоб "Ейнштейн" і "Einstein" були схожими)"""
+    return "".join(TRANSLIT.get(ch, ch) for ch in text)
+
+
+def _numbers(text: str) -> set:
+    return {number.replace(",", ".") for number in NUMBER_RE.findall(text)}
+
+
+def _scripts(text: str) -> set:
+    """Писемності літер тексту (CYRILLIC, LATIN, ...)"""
+    return {unicodedata.name(ch, "").split(" ")[0] for ch in text if ch.isalpha()}
+
+
+def _confidently_wrong(answer: str, reference: str) -> bool:
+    """Низьку схожість можна вважати неправильною відповіддю лише для порівнянних слів"""
+    if len(answer.split()) != 1 or len(reference.split()) != 1:
+        return False
+    if not _scripts(answer) & _scripts(reference):
+        return False
+    return _similarity(answer, reference) < WRONG_THRESHOLD
+
+
+def _edit_distance(left: str, right: str) -> int:
+    """Відстань Левенштейна"""
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, 1):
+        current = [i]
+        for j, right_char in enumerate(right, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (left_char != right_char)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def _allowed_typos(reference: str) -> int:
+    """Допустима кількість помилок: короткі слова ("Рим" / "Крим") мають збігатися точно"""
+    length = len(reference.replace(" ", ""))
+    if length <= 5:
+        return 0
+    if length <= 10:
+        return 1
+    return 2
+
+
+def _matches(answer: str, reference: str) -> bool:
+    """Вся відповідь (без доданих слів) збігається з еталоном з точністю до друкарських помилок"""
+    if not answer or not reference:
+        return False
+    # Допуск рахуємо за оригіналом: транслітерація подовжує слова ("ж" -> "zh")
+    allowed = _allowed_typos(reference)
+    for left, right in ((answer, reference), (transliterate(answer), transliterate(reference))):
+        if _edit_distance(left, right) <= allowed:
+            return True
+    return False
+
+
+def _similarity(answer: str, reference: str) -> float:
+    """
+    Найкраща схожість з урахуванням транслітерації та входження відповіді як цілих слів
+
+    Лише відокремлює явно неправильні відповіді від сумнівних: входження еталону
+    ("не Париж", "Лондон або Париж") дає високу схожість, але не робить відповідь правильною.
+    """
+    if not answer or not reference:
+        return 0.0
+
+    best = 0.0
+    for left, right in ((answer, reference), (transliterate(answer), transliterate(reference))):
+        if left == right:
+            return 1.0
+        # "Це був Париж" містить "париж" - порівнюємо з вікнами такої ж довжини
+        left_words = left.split()
+        width = len(right.split())
+        for start in range(max(1, len(left_words) - width + 1)):
+            window = " ".join(left_words[start:start + width])
+            best = max(best, SequenceMatcher(None, window, right).ratio())
+        best = max(best, SequenceMatcher(None, left, right).ratio())
+
+    return best
+
+
+def grade_answer(user_answer: str, answer: str, aliases: list = None) -> tuple:
+    """
+    Перевіряє відповідь локально
+
+    Args:
+        user_answer: Відповідь користувача
+        answer: Канонічна відповідь
+        aliases: Допустимі варіанти написання
+
+    Returns:
+        (CORRECT | WRONG | UNCERTAIN, найкраща схожість 0..1)
+    """
+    user_normalized = normalize(user_answer)
+    references = [normalize(item) for item in [answer] + list(aliases or []) if item]
+
+    verdict = UNCERTAIN
+    score = 0.0
+
+    # Числа та дати: якщо в еталоні є число, воно має збігатися
+    reference_numbers = [_numbers(reference) for reference in references if _numbers(reference)]
+    user_numbers = _numbers(user_normalized)
+    if reference_numbers:
+        if not user_numbers:
+            # Число могли написати словами ("чотири") - вирішує модель
+            grading_stats[UNCERTAIN] += 1
+            return UNCERTAIN, 0.0
+        if any(numbers == user_numbers for numbers in reference_numbers) and \
+                any(_matches(user_normalized, reference) for reference in references):
+            verdict, score = CORRECT, 1.0
+        elif not any(numbers & user_numbers for numbers in reference_numbers):
+            verdict, score = WRONG, 0.0
+        else:
+            # Зайві числа або слова ("1944 або 1945", "не 1945") - вирішує модель
+            score = max(_similarity(user_normalized, reference) for reference in references)
+        grading_stats[verdict] += 1
+        return verdict, score
+
+    if any(_matches(user_normalized, reference) for reference in references):
+        verdict, score = CORRECT, 1.0
+    else:
+        score = max((_similarity(user_normalized, reference) for reference in references), default=0.0)
+        if references and all(_confidently_wrong(user_normalized, reference) for reference in references):
+            verdict = WRONG
+
+    grading_stats[verdict] += 1
+    return verdict, score
+
+
+def local_resolution_rate() -> float:
+    """Частка відповідей, вирішених без звернення до моделі"""
+    total = sum(grading_stats.values())
+    if not total:
+        return 0.0
+    return (grading_stats[CORRECT] + grading_stats[WRONG]) / total
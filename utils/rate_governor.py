@@ -0,0 +1,205 @@
+"""
+Глобальний регулятор звернень до OpenAI: token bucket по RPM/TPM для кожної моделі
+та справедлива черга між користувачами
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from config import CHAT_RPM, CHAT_TPM, WHISPER_RPM, TTS_RPM, OPENAI_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Ліміти (RPM, TPM) для моделей, що відрізняються від чату; TPM None - без ліміту токенів
+MODEL_LIMITS = {
+    "whisper-1": (WHISPER_RPM, None),
+    "tts-1": (TTS_RPM, None),
+}
+
+
+class TokenBucket:
+    """Відро токенів: per_minute на хвилину, поповнюється рівномірно (capacity - максимальний сплеск)"""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.capacity = float(capacity or per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Скільки секунд чекати, доки в відрі буде amount токенів"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class ModelLimiter:
+    """
+    Ліміти однієї моделі з чергою очікування
+
+    Запити кожного користувача стоять у власній черзі; черги обслуговуються
+    по колу (round-robin), тож активний користувач не витісняє інших.
+    Черги користувачів з нижчим пріоритетом (понад денний бюджет) обслуговуються,
+    лише коли інших запитів у черзі немає.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int = None):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+        # user_id -> deque[(future, tokens, час постановки в чергу)]
+        self._queues = {}
+        self._order = deque()
+        self._low_priority = set()
+        self._timer = None
+
+        self.granted = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = self.requests.wait_time(1)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def _grant(self, future: asyncio.Future, tokens: int, enqueued: float):
+        self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+
+        waited = time.monotonic() - enqueued
+        self.granted += 1
+        if waited > 0.001:
+            self.waited += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        future.set_result(None)
+
+    def _drop_done(self):
+        """Прибирає скасованих очікувачів і порожні черги"""
+        for user_id in list(self._order):
+            queue = self._queues[user_id]
+            while queue and queue[0][0].done():
+                queue.popleft()
+            if not queue:
+                self._order.remove(user_id)
+                del self._queues[user_id]
+                self._low_priority.discard(user_id)
+
+    def _next_user(self):
+        """Перший по колу користувач зі звичайним пріоритетом, інакше - з нижчим"""
+        for user_id in self._order:
+            if user_id not in self._low_priority:
+                return user_id
+        return self._order[0]
+
+    def _pump(self):
+        """Видає дозволи по колу між користувачами, поки дозволяють відра"""
+        self._timer = None
+
+        while True:
+            self._drop_done()
+            if not self._order:
+                return
+
+            user_id = self._next_user()
+            future, tokens, enqueued = self._queues[user_id][0]
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+
+            self._queues[user_id].popleft()
+            self._grant(future, tokens, enqueued)
+
+            # Наступний дозвіл - наступному користувачу
+            self._order.remove(user_id)
+            self._order.append(user_id)
+
+    async def acquire(self, user_id, tokens: int = 0, low_priority: bool = False):
+        """
+        Чекає дозволу на запит з оцінкою tokens токенів
+
+        Args:
+            user_id: ID користувача, чия черга використовується
+            tokens: Оцінка токенів запиту
+            low_priority: Обслуговувати після черг інших користувачів
+        """
+        if not self._order and self._wait_time(tokens) == 0:
+            self.requests.consume(1)
+            if self.tokens is not None:
+                self.tokens.consume(tokens)
+            self.granted += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        if user_id not in self._queues:
+            self._queues[user_id] = deque()
+            self._order.append(user_id)
+        self._queues[user_id].append((future, tokens, time.monotonic()))
+        if low_priority:
+            self._low_priority.add(user_id)
+        else:
+            self._low_priority.discard(user_id)
+
+        if self._timer is None:
+            self._pump()
+
+        logger.info(f"OpenAI {self.name}: запит у черзі (глибина {self.queue_depth})")
+        await future
+
+    def stats(self) -> dict:
+        """Метрики черги та очікування"""
+        return {
+            "queue_depth": self.queue_depth,
+            "granted": self.granted,
+            "waited": self.waited,
+            "avg_wait": self.total_wait / self.waited if self.waited else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+class RateGovernor:
+    """Набір лімітерів за назвою моделі; ліміти одного ключа множаться на кількість ключів"""
+
+    def __init__(self, key_count: int = 1):
+        self.key_count = max(1, key_count)
+        self._limiters = {}
+
+    def limiter(self, model: str) -> ModelLimiter:
+        if model not in self._limiters:
+            rpm, tpm = MODEL_LIMITS.get(model, (CHAT_RPM, CHAT_TPM))
+            self._limiters[model] = ModelLimiter(
+                model, rpm * self.key_count, tpm * self.key_count if tpm else None
+            )
+        return self._limiters[model]
+
+    async def acquire(self, model: str, user_id=None, tokens: int = 0, low_priority: bool = False):
+        """Чекає, доки запит до моделі вкладеться в RPM/TPM"""
+        await self.limiter(model).acquire(user_id, tokens, low_priority)
+
+    def stats(self) -> dict:
+        return {model: limiter.stats() for model, limiter in self._limiters.items()}
+
+
+rate_governor = RateGovernor(len(OPENAI_TOKENS))
@@ -0,0 +1,16 @@
+"""
+Контекст поточного запиту (користувач), доступний у шарі OpenAI без передачі параметрів
+"""
+from contextvars import ContextVar
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+# ID користувача, чий апдейт зараз обробляється (None - фонові задачі)
+current_user_id = ContextVar("current_user_id", default=None)
+
+
+async def set_request_context(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """TypeHandler з групи -1: запам'ятовує користувача для всіх обробників цього апдейту"""
+    user = update.effective_user
+    current_user_id.set(user.id if user else None)
@@ -0,0 +1,196 @@
+"""
+Повтори з експоненційною затримкою та запобіжник (circuit breaker) для викликів OpenAI
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import nullcontext
+
+import openai
+
+from config import (
+    OPENAI_MAX_RETRIES, OPENAI_DEADLINE, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN
+)
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+
+class CircuitOpenError(Exception):
+    """Запобіжник розімкнено - OpenAI зараз деградував, запит відхилено одразу"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Тимчасові помилки: 429 (крім вичерпаної квоти), 5xx, таймаути та збої з'єднання"""
+    if isinstance(error, openai.RateLimitError):
+        code = getattr(error, "code", None)
+        return code != "insufficient_quota"
+    return isinstance(error, (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+        asyncio.TimeoutError,
+    ))
+
+
+def retry_after_seconds(error: Exception):
+    """Значення Retry-After з відповіді OpenAI (секунди) або None"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """Експоненційна затримка з повним джитером; Retry-After має пріоритет"""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Запобіжник: після threshold послідовних збоїв розмикається на cooldown секунд,
+    потім пропускає один пробний запит (half-open)
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Кидає CircuitOpenError, якщо запит потрібно відхилити одразу
+
+        Returns:
+            True якщо цей запит - пробний (half-open)
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half-open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError(f"Запобіжник {self.name} розімкнено")
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Запобіжник {self.name} знову замкнено")
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probe_in_flight or self.failures >= self.threshold:
+            if self.opened_at is None or self.probe_in_flight:
+                logger.warning(f"Запобіжник {self.name} розімкнено після {self.failures} збоїв")
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+    def release_probe(self):
+        """Пробний запит завершився без висновку про стан upstream (напр. 400 або скасування)"""
+        self.probe_in_flight = False
+
+
+openai_breaker = CircuitBreaker("openai")
+
+
+async def call_with_retries(factory, breaker: CircuitBreaker = openai_breaker,
+                            max_retries: int = OPENAI_MAX_RETRIES, deadline: float = OPENAI_DEADLINE,
+                            before_attempt=None, slot=None):
+    """
+    Виконує запит з повторами тимчасових помилок у межах загального дедлайну
+
+    Args:
+        factory: Функція без аргументів, що повертає корутину запиту
+        breaker: Запобіжник для цього upstream
+        max_retries: Максимальна кількість повторів
+        deadline: Загальний час на всі спроби (сек)
+        before_attempt: Функція без аргументів, що повертає корутину очікування перед
+            кожною спробою (регулятор швидкості); цей час не входить у дедлайн
+        slot: Функція без аргументів, що повертає асинхронний контекст-менеджер, який
+            утримується лише на час однієї спроби (слот смуги); очікування слоту не входить у дедлайн
+
+    Returns:
+        Результат запиту
+    """
+    is_probe = breaker.before_call()
+    settled = False
+
+    loop = asyncio.get_running_loop()
+    deadline_at = None
+    attempt = 0
+
+    try:
+        while True:
+            # Очікування у власній черзі та слоту - не збій upstream, тож дедлайн зсуваємо
+            waited_from = loop.time()
+            if before_attempt is not None:
+                await before_attempt()
+
+            # Слот займаємо лише на час самого запиту, а не на паузи між повторами
+            async with (slot() if slot is not None else nullcontext()):
+                # Відлік дедлайну починається з першого реального запиту
+                if deadline_at is None:
+                    deadline_at = loop.time() + deadline
+                else:
+                    deadline_at += loop.time() - waited_from
+
+                error = None
+                try:
+                    result = await asyncio.wait_for(factory(), timeout=max(0.1, deadline_at - loop.time()))
+                except Exception as e:
+                    error = e
+
+            if error is None:
+                breaker.record_success()
+                settled = True
+                return result
+
+            if not is_retryable(error):
+                raise error
+
+            delay = backoff_delay(attempt, retry_after_seconds(error))
+            attempt += 1
+
+            if attempt > max_retries or loop.time() + delay >= deadline_at:
+                breaker.record_failure()
+                settled = True
+                raise error
+
+            logger.warning(f"Тимчасова помилка OpenAI ({type(error).__name__}), повтор {attempt} через {delay:.1f} с")
+            await asyncio.sleep(delay)
+    finally:
+        # Пробний запит завершився без висновку (неповторювана помилка, скасування) - звільняємо пробу
+        if is_probe and not settled:
+            breaker.release_probe()
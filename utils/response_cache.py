@@ -0,0 +1,157 @@
+"""
+LRU + TTL кеш відповідей моделі з опціональним дисковим рівнем SQLite
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_DB
+
+logger = logging.getLogger(__name__)
+
+# Як часто видаляти з SQLite давно прострочені записи (сек)
+PURGE_INTERVAL = 60 * 60
+
+
+class ResponseCache:
+    """
+    Кеш детермінованих відповідей (переклади та інші запити з низькою температурою)
+
+    Перший рівень - OrderedDict у пам'яті (LRU + TTL), другий - таблиця SQLite,
+    яка переживає перезапуск бота (якщо задано шлях до бази). Запис у SQLite
+    виконується в окремому потоці з власним з'єднанням, щоб не блокувати event loop.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl: float = RESPONSE_CACHE_TTL, db_path: str = RESPONSE_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+
+        # key -> (value, час створення)
+        self._items = OrderedDict()
+        self._db = None
+        # Один потік запису - записи виконуються по черзі через власне з'єднання
+        self._writer = None
+        self._write_db = None
+        self._purged_at = 0.0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _open(self):
+        db = sqlite3.connect(self.db_path)
+        # WAL: читання не чекають на запис з потоку записувача
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        db.commit()
+        return db
+
+    def _connection(self):
+        if self._db is None and self.db_path:
+            self._db = self._open()
+        return self._db
+
+    def _remember(self, key: str, value: str, created: float):
+        self._items[key] = (value, created)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def get(self, key: str, allow_stale: bool = False):
+        """
+        Повертає збережену відповідь або None
+
+        Args:
+            key: Ключ запиту
+            allow_stale: Повертати й прострочені записи (коли OpenAI недоступний)
+        """
+        now = time.time()
+        ttl = float("inf") if allow_stale else self.ttl
+
+        item = self._items.get(key)
+        if item is not None:
+            if now - item[1] <= ttl:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[0]
+
+        db = self._connection()
+        if db is not None:
+            try:
+                row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Помилка читання кешу SQLite: {e}")
+                row = None
+            if row and now - row[1] <= ttl:
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: str):
+        """Зберігає відповідь у пам'ять і (якщо налаштовано) у SQLite у фоновому потоці"""
+        created = time.time()
+        self._remember(key, value, created)
+
+        if self._connection() is None:
+            return
+
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        try:
+            asyncio.get_running_loop().run_in_executor(self._writer, self._write, key, value, created)
+        except RuntimeError:
+            # Поза event loop (скрипти) - пишемо одразу
+            self._write(key, value, created)
+
+    def _write(self, key: str, value: str, created: float):
+        """Запис у SQLite (у потоці записувача)"""
+        try:
+            if self._write_db is None:
+                self._write_db = self._open()
+            self._write_db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key, value, created)
+            )
+            # Прострочені записи ще якийсь час слугують запасом на час збоїв OpenAI
+            if created - self._purged_at >= PURGE_INTERVAL:
+                self._purged_at = created
+                self._write_db.execute("DELETE FROM responses WHERE created < ?", (created - 2 * self.ttl,))
+            self._write_db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Помилка запису кешу SQLite: {e}")
+
+    def _close_writer(self):
+        if self._write_db is not None:
+            self._write_db.close()
+            self._write_db = None
+
+    def close(self):
+        if self._writer is not None:
+            # Дочікуємось записів у черзі і закриваємо з'єднання в потоці записувача
+            self._writer.submit(self._close_writer)
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> dict:
+        """Лічильники для діагностики"""
+        return {
+            "entries": len(self._items),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
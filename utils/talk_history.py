@@ -0,0 +1,122 @@
+"""
+Історія діалогу /talk з обмеженням за токенами та згортанням старих реплік у підсумок
+"""
+import logging
+
+from config import TALK_HISTORY_TOKEN_BUDGET, TALK_HISTORY_KEEP_MESSAGES
+from utils.openai_helper import get_chatgpt_json_async
+from utils.token_counter import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Онови короткий підсумок діалогу. Збережи факти про співрозмовника, "
+    "важливі теми та домовленості, не більше 5-7 речень.\n\n"
+    "Попередній підсумок:\n{summary}\n\n"
+    "Нові репліки:\n{dialogue}\n\n"
+    'Відповідай JSON-об\'єктом у форматі {{"summary": "..."}}.'
+)
+
+
+class TalkHistory:
+    """
+    Історія розмови з особою
+
+    Кількість токенів рахується один раз при додаванні повідомлення.
+    У запит потрапляє системний промпт, підсумок старих реплік та
+    ковзне вікно останніх повідомлень, що вміщається в бюджет.
+    Згортання старих реплік у підсумок виконується окремо (compact),
+    поза критичним шляхом відповіді.
+    """
+
+    def __init__(self, system_prompt: str, budget: int = TALK_HISTORY_TOKEN_BUDGET,
+                 keep_messages: int = TALK_HISTORY_KEEP_MESSAGES):
+        self.system = self._entry("system", system_prompt)
+        self.budget = budget
+        self.keep_messages = keep_messages
+
+        self.summary = ""
+        self.summary_tokens = 0
+        self.turns = []
+        self.compacting = False
+
+    @staticmethod
+    def _entry(role: str, content: str) -> dict:
+        message = {"role": role, "content": content}
+        return {"message": message, "tokens": estimate_message_tokens(message)}
+
+    def add(self, role: str, content: str):
+        """Додає репліку (токени рахуються тут і кешуються)"""
+        self.turns.append(self._entry(role, content))
+
+    @property
+    def turn_tokens(self) -> int:
+        return sum(entry["tokens"] for entry in self.turns)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return (not self.compacting
+                and len(self.turns) > self.keep_messages
+                and self.turn_tokens > self.budget)
+
+    def messages(self) -> list:
+        """Повідомлення для запиту: системний промпт, підсумок і останні репліки в межах бюджету"""
+        messages = [self.system["message"]]
+        available = self.budget
+
+        if self.summary:
+            messages.append({"role": "system", "content": f"Підсумок попередньої розмови: {self.summary}"})
+            available -= self.summary_tokens
+
+        window = []
+        for entry in reversed(self.turns):
+            # Останню репліку користувача відправляємо завжди, навіть якщо вона велика
+            if window and entry["tokens"] > available:
+                break
+            window.append(entry["message"])
+            available -= entry["tokens"]
+
+        messages.extend(reversed(window))
+        return messages
+
+    async def compact(self):
+        """
+        Згортає найстаріші репліки в підсумок, щоб історія повернулась у половину бюджету
+
+        Викликається у фоні після відповіді; репліки, додані під час згортання, не втрачаються.
+        """
+        if not self.needs_compaction:
+            return
+
+        self.compacting = True
+        try:
+            folded = []
+            remaining = self.turn_tokens
+            for entry in self.turns[:-self.keep_messages]:
+                if remaining <= self.budget // 2:
+                    break
+                folded.append(entry)
+                remaining -= entry["tokens"]
+
+            if not folded:
+                return
+
+            dialogue = "\n".join(f"{entry['message']['role']}: {entry['message']['content']}" for entry in folded)
+            data = await get_chatgpt_json_async(
+                SUMMARY_PROMPT.format(summary=self.summary or "(немає)", dialogue=dialogue),
+                task="talk_summary"
+            )
+            summary = data.get("summary") if isinstance(data, dict) else None
+
+            if not summary:
+                logger.warning("Не вдалося створити підсумок діалогу, історія залишається без змін")
+                return
+
+            folded_ids = {id(entry) for entry in folded}
+            self.turns = [entry for entry in self.turns if id(entry) not in folded_ids]
+            self.summary = summary
+            self.summary_tokens = estimate_message_tokens({"content": summary})
+
+            logger.info(f"Згорнуто {len(folded)} реплік у підсумок, залишилось {self.turn_tokens} токенів")
+        finally:
+            self.compacting = False
@@ -0,0 +1,23 @@
+"""
+Спільне для надсилання медіа за file_id: розпізнавання відхиленого file_id та ліміт підпису
+"""
+from telegram.error import BadRequest
+
+# Максимальна довжина підпису до фото, голосового тощо
+TELEGRAM_CAPTION_LIMIT = 1024
+
+# Фрагменти помилок Telegram, що означають недійсний або застарілий file_id
+FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "file reference", "file_reference")
+
+
+def is_file_id_error(error: BadRequest) -> bool:
+    """True, якщо Telegram відхилив саме file_id (а не підпис, клавіатуру тощо)"""
+    message = str(error).lower()
+    return any(fragment in message for fragment in FILE_ID_ERRORS)
+
+
+def fit_caption(caption: str) -> str:
+    """Обрізає підпис до ліміту Telegram"""
+    if caption is None or len(caption) <= TELEGRAM_CAPTION_LIMIT:
+        return caption
+    return caption[:TELEGRAM_CAPTION_LIMIT - 1] + "…"
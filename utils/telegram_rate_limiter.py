@@ -0,0 +1,220 @@
+"""
+Обмеження вихідних запитів до Telegram: загальний ліміт, ліміт на чат і пріоритет фінальних відповідей
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_GROUP_RATE, TELEGRAM_MAX_RETRIES
+)
+from utils.rate_governor import TokenBucket
+from utils.telegram_stream import _retry_seconds
+
+logger = logging.getLogger(__name__)
+
+# Пріоритети: менше значення - раніше
+FINAL = 0
+STATUS = 1
+
+# Максимальний сплеск повідомлень в один чат
+CHAT_BURST = 3
+
+# Як часто прибирати відра неактивних чатів і завершені паузи (сек)
+PRUNE_INTERVAL = 60.0
+
+
+def _is_throttled(endpoint: str) -> bool:
+    """Обмежуємо лише запити, що щось відправляють або змінюють у чаті"""
+    return endpoint.startswith(("send", "edit", "copy", "forward"))
+
+
+def _priority(endpoint: str, data: dict) -> int:
+    """Дії чату та проміжні редагування без клавіатури - статуси, решта - фінальні відповіді"""
+    if endpoint == "sendChatAction":
+        return STATUS
+    if endpoint.startswith("edit") and not data.get("reply_markup"):
+        return STATUS
+    return FINAL
+
+
+class TelegramRateLimiter(BaseRateLimiter):
+    """
+    Розподіляє вихідні запити бота в часі, щоб не отримувати flood-wait (429)
+
+    Запит чекає, доки дозволять загальне відро (TELEGRAM_GLOBAL_RATE/сек) і відро
+    його чату (особисті чати - TELEGRAM_CHAT_RATE/сек, групи - TELEGRAM_GROUP_RATE/хв).
+    Фінальні відповіді обслуговуються раніше за статуси; після 429 чат
+    призупиняється на retry_after, а запит повторюється.
+    """
+
+    def __init__(self, global_rate: float = TELEGRAM_GLOBAL_RATE, chat_rate: float = TELEGRAM_CHAT_RATE,
+                 group_rate: float = TELEGRAM_GROUP_RATE, max_retries: int = TELEGRAM_MAX_RETRIES):
+        self.global_bucket = TokenBucket(global_rate * 60, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+
+        self._chat_buckets = {}
+        self._paused_until = {}
+        self._global_paused_until = 0.0
+        self._pruned_at = time.monotonic()
+
+        # Черга очікування: (пріоритет, порядковий номер, chat_id, future, час постановки)
+        self._waiters = []
+        self._counter = itertools.count()
+        self._timer = None
+
+        self.sent = 0
+        self.throttled = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+        self.max_queue_depth = 0
+        self.retry_after_hits = 0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        if chat_id not in self._chat_buckets:
+            # Від'ємні chat_id - групи та канали з суворішим лімітом
+            if str(chat_id).startswith("-"):
+                bucket = TokenBucket(self.group_rate, capacity=CHAT_BURST)
+            else:
+                bucket = TokenBucket(self.chat_rate * 60, capacity=CHAT_BURST)
+            self._chat_buckets[chat_id] = bucket
+        return self._chat_buckets[chat_id]
+
+    def _wait_time(self, chat_id, now: float) -> float:
+        wait = max(self.global_bucket.wait_time(1), self._global_paused_until - now)
+        if chat_id is not None:
+            wait = max(
+                wait,
+                self._chat_bucket(chat_id).wait_time(1),
+                self._paused_until.get(chat_id, 0.0) - now
+            )
+        return wait
+
+    def _pump(self):
+        """Видає дозволи в порядку пріоритету; зайнятий чат не блокує інші чати"""
+        self._timer = None
+        now = time.monotonic()
+        next_wait = None
+        pending = []
+
+        while self._waiters:
+            item = heapq.heappop(self._waiters)
+            _, _, chat_id, future, enqueued = item
+            if future.done():
+                continue
+
+            wait = self._wait_time(chat_id, now)
+            if wait > 0:
+                pending.append(item)
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                # Загальний ліміт вичерпано - далі по черзі теж ніхто не пройде
+                if self.global_bucket.wait_time(1) > 0 or self._global_paused_until > now:
+                    break
+                continue
+
+            self._grant(chat_id, future, now - enqueued)
+
+        for item in pending:
+            heapq.heappush(self._waiters, item)
+
+        if self._waiters and next_wait is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_wait, self._pump)
+
+    def _prune(self, now: float):
+        """Видаляє повні відра чатів (вони не відрізняються від нових) і завершені паузи"""
+        if now - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if bucket.wait_time(bucket.capacity) == 0:
+                del self._chat_buckets[chat_id]
+        for chat_id, paused_until in list(self._paused_until.items()):
+            if paused_until <= now:
+                del self._paused_until[chat_id]
+
+    def _grant(self, chat_id, future: asyncio.Future = None, delay: float = 0.0):
+        self._prune(time.monotonic())
+        self.global_bucket.consume(1)
+        if chat_id is not None:
+            self._chat_bucket(chat_id).consume(1)
+
+        self.sent += 1
+        if delay > 0.001:
+            self.throttled += 1
+            self.total_delay += delay
+            self.max_delay = max(self.max_delay, delay)
+            if delay > 1:
+                logger.info(f"Відправку в чат {chat_id} затримано на {delay:.1f} с, у черзі {len(self._waiters)}")
+
+        if future is not None:
+            future.set_result(None)
+
+    async def _acquire(self, chat_id, priority: int):
+        now = time.monotonic()
+        if not self._waiters and self._wait_time(chat_id, now) == 0:
+            self._grant(chat_id)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), chat_id, future, now))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+
+        # Новий запит може бути в вільний чат - перераховуємо чергу одразу
+        if self._timer:
+            self._timer.cancel()
+        self._pump()
+
+        await future
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._timer:
+            self._timer.cancel()
+        logger.info(f"Статистика відправки в Telegram: {self.stats()}")
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if not _is_throttled(endpoint):
+            return await callback(*args, **kwargs)
+
+        chat_id = data.get("chat_id")
+        priority = rate_limit_args if isinstance(rate_limit_args, int) else _priority(endpoint, data)
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.retry_after_hits += 1
+                pause_until = time.monotonic() + _retry_seconds(e)
+                if chat_id is None:
+                    self._global_paused_until = max(self._global_paused_until, pause_until)
+                else:
+                    self._paused_until[chat_id] = max(self._paused_until.get(chat_id, 0.0), pause_until)
+                logger.warning(f"Telegram flood-wait {_retry_seconds(e)} с для чату {chat_id} ({endpoint})")
+                if attempt == self.max_retries:
+                    raise
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "throttled": self.throttled,
+            "avg_delay": self.total_delay / self.throttled if self.throttled else 0.0,
+            "max_delay": self.max_delay,
+            "retry_after": self.retry_after_hits,
+        }
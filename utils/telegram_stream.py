@@ -0,0 +1,173 @@
+"""
+Відображення відповіді в одному повідомленні Telegram: етапи обробки, потокова відповідь ChatGPT, фінальний текст
+"""
+import asyncio
+import logging
+from telegram import Message, InlineKeyboardMarkup
+from telegram.constants import ChatAction
+from telegram.error import BadRequest, RetryAfter
+
+from config import STREAM_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Максимальна довжина тексту одного повідомлення Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Курсор, який показуємо поки відповідь ще генерується
+CURSOR = " ▌"
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    """Повертає retry_after у секундах (int або timedelta залежно від версії)"""
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+async def _edit(message: Message, text: str, reply_markup: InlineKeyboardMarkup = None) -> bool:
+    """
+    Редагує повідомлення, ігноруючи "message is not modified"
+
+    Returns:
+        True якщо редагування виконано (або текст не змінився)
+    """
+    try:
+        await message.edit_text(text, reply_markup=reply_markup)
+        return True
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            return True
+        raise
+
+
+async def stream_to_message(placeholder: Message, deltas, prefix: str = "",
+                            reply_markup: InlineKeyboardMarkup = None,
+                            min_interval: float = STREAM_EDIT_INTERVAL) -> str:
+    """
+    Поступово редагує повідомлення-заглушку текстом, що надходить частинами
+
+    Редагування виконується не частіше ніж раз на min_interval секунд,
+    а при flood-wait від Telegram проміжні оновлення пропускаються.
+    Фінальне редагування додає клавіатуру reply_markup.
+
+    Args:
+        placeholder: Повідомлення "⏳ Думаю...", яке буде відредаговано
+        deltas: Асинхронний ітератор фрагментів тексту
+        prefix: Текст перед відповіддю (наприклад, емодзі особи)
+        reply_markup: Клавіатура для фінального повідомлення
+        min_interval: Мінімальний інтервал між редагуваннями (сек)
+
+    Returns:
+        Повний текст відповіді (без prefix)
+    """
+    loop = asyncio.get_running_loop()
+    text = ""
+    next_edit_at = 0.0
+
+    async for delta in deltas:
+        text += delta
+
+        now = loop.time()
+        if now < next_edit_at or not text.strip():
+            continue
+
+        # Під час генерації показуємо лише хвіст, що вміщається в одне повідомлення
+        preview = (prefix + text)[-(TELEGRAM_MESSAGE_LIMIT - len(CURSOR)):] + CURSOR
+        try:
+            await _edit(placeholder, preview)
+            next_edit_at = now + min_interval
+        except RetryAfter as e:
+            next_edit_at = now + _retry_seconds(e)
+            logger.warning(f"Telegram flood-wait при потоковому редагуванні: {e}")
+
+    await _finalize(placeholder, prefix + text, reply_markup)
+
+    return text
+
+
+async def _finalize(placeholder: Message, full_text: str, reply_markup: InlineKeyboardMarkup = None):
+    """Записує фінальний текст; якщо він довший за ліміт - досилає решту окремими повідомленнями"""
+    chunks = [
+        full_text[i:i + TELEGRAM_MESSAGE_LIMIT]
+        for i in range(0, len(full_text), TELEGRAM_MESSAGE_LIMIT)
+    ] or ["…"]
+
+    for index, chunk in enumerate(chunks):
+        markup = reply_markup if index == len(chunks) - 1 else None
+
+        for _ in range(2):
+            try:
+                if index == 0:
+                    await _edit(placeholder, chunk, reply_markup=markup)
+                else:
+                    await placeholder.reply_text(chunk, reply_markup=markup)
+                break
+            except RetryAfter as e:
+                logger.warning(f"Telegram flood-wait при фінальному редагуванні: {e}")
+                await asyncio.sleep(_retry_seconds(e))
+
+
+class ProgressMessage:
+    """
+    Одне статусне повідомлення на всю взаємодію
+
+    Перший етап надсилає заглушку, наступні редагують її, а finish() перетворює
+    її на фінальну відповідь з клавіатурою - замість окремого повідомлення на кожен етап.
+    Якщо фінальна відповідь не текстова (фото, голосове), замість заглушки
+    показується дія чату (action), яка не створює повідомлень.
+    """
+
+    def __init__(self, reply_to: Message, action: str = None):
+        """
+        Args:
+            reply_to: Повідомлення, на яке відповідаємо
+            action: Дія чату (ChatAction) замість текстових етапів
+        """
+        self.reply_to = reply_to
+        self.action = action
+        self.message = None
+
+    async def stage(self, text: str):
+        """Показує поточний етап (надсилає заглушку або редагує її)"""
+        if self.action:
+            await self.show_action(self.action)
+            return
+
+        if self.message is None:
+            self.message = await self.reply_to.reply_text(text)
+            return
+
+        try:
+            await _edit(self.message, text)
+        except RetryAfter as e:
+            # Проміжний етап не критичний - пропускаємо
+            logger.warning(f"Telegram flood-wait при оновленні статусу: {e}")
+
+    async def show_action(self, action: str = ChatAction.TYPING):
+        """Показує індикатор дії ("друкує...", "записує аудіо...") без повідомлення"""
+        try:
+            await self.reply_to.get_bot().send_chat_action(self.reply_to.chat_id, action)
+        except RetryAfter as e:
+            logger.warning(f"Telegram flood-wait при надсиланні дії: {e}")
+
+    async def finish(self, text: str, reply_markup: InlineKeyboardMarkup = None) -> Message:
+        """Перетворює заглушку на фінальну відповідь (або надсилає її, якщо заглушки не було)"""
+        if self.message is None:
+            self.message = await self.reply_to.reply_text(text, reply_markup=reply_markup)
+        else:
+            await _finalize(self.message, text, reply_markup)
+        return self.message
+
+    async def stream(self, deltas, prefix: str = "", reply_markup: InlineKeyboardMarkup = None,
+                     placeholder: str = "⏳ Думаю...") -> str:
+        """
+        Показує потокову відповідь у статусному повідомленні (див. stream_to_message)
+
+        Returns:
+            Повний текст відповіді (без prefix)
+        """
+        if self.message is None:
+            self.message = await self.reply_to.reply_text(placeholder)
+        return await stream_to_message(self.message, deltas, prefix=prefix, reply_markup=reply_markup)
@@ -0,0 +1,30 @@
+"""
+Офлайн-оцінка кількості токенів
+"""
+
+# Службові токени на кожне повідомлення чату (role, роздільники)
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Приблизна кількість токенів у тексті без звернення до API
+
+    Латиниця в середньому ~4 символи на токен, кирилиця та інші
+    не-ASCII символи - ~2.5 символу на токен.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    other_chars = len(text) - ascii_chars
+    return int(ascii_chars / 4 + other_chars / 2.5) + 1
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Оцінка токенів одного повідомлення чату"""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def estimate_messages_tokens(messages: list) -> int:
+    """Оцінка токенів списку повідомлень"""
+    return sum(estimate_message_tokens(message) for message in messages)
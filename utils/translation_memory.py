@@ -0,0 +1,145 @@
+"""
+Пам'ять перекладів на рівні речень: у модель надсилаються лише нові речення
+"""
+import hashlib
+import json
+import logging
+import re
+
+from utils.openai_helper import get_chatgpt_json_async, translate_text_async, task_max_tokens, response_cache
+
+logger = logging.getLogger(__name__)
+
+# Кінець речення: . ! ? … (можливо з лапками/дужками) і пробіли після нього
+SENTENCE_END_RE = re.compile(r"(?<=[.!?…])[\"'»)\]]*\s+")
+
+BATCH_PROMPT = (
+    "Переклади кожне речення зі списку на {language}. Зберігай порядок і кількість елементів, "
+    "не об'єднуй і не розділяй речення, не додавай пояснень.\n\n"
+    "Речення (JSON):\n{segments}\n\n"
+    'Відповідай JSON-об\'єктом у форматі {{"translations": ["...", "..."]}}.'
+)
+
+
+def split_segments(text: str) -> list:
+    """
+    Розбиває текст на речення, зберігаючи роздільники для зворотного складання
+
+    Returns:
+        Список пар (речення, роздільник після нього)
+    """
+    segments = []
+    for line_index, line in enumerate(text.split("\n")):
+        if line_index:
+            # Перенос рядка додаємо до роздільника попереднього сегмента
+            if segments:
+                sentence, separator = segments[-1]
+                segments[-1] = (sentence, separator + "\n")
+            else:
+                segments.append(("", "\n"))
+
+        position = 0
+        for match in SENTENCE_END_RE.finditer(line):
+            sentence = line[position:match.start()] + match.group(0).rstrip()
+            separator = match.group(0)[len(match.group(0).rstrip()):]
+            segments.append((sentence.strip(), " " if separator else ""))
+            position = match.end()
+
+        rest = line[position:].strip()
+        if rest:
+            segments.append((rest, ""))
+
+    return segments
+
+
+class TranslationMemory:
+    """Переклади окремих речень для кожної мови з LANGUAGES"""
+
+    def __init__(self):
+        # Спільний кеш відповідей (ключі з префіксом "tm:") - одне з'єднання SQLite, закривається при зупинці
+        self._store = response_cache
+
+        self.segment_hits = 0
+        self.segment_misses = 0
+
+    @staticmethod
+    def _key(sentence: str, target_language: str) -> str:
+        normalized = " ".join(sentence.split())
+        return "tm:" + hashlib.sha256(f"{target_language}\0{normalized}".encode("utf-8")).hexdigest()
+
+    async def _translate_batch(self, sentences: list, target_language: str):
+        """
+        Перекладає список речень одним запитом; повертає список перекладів або None
+
+        Навіть одне речення йде цим шляхом: get_chatgpt_json_async повертає None при помилці,
+        тож у пам'ять не потрапляє текст вибачення замість перекладу.
+        """
+        data = await get_chatgpt_json_async(
+            BATCH_PROMPT.format(
+                language=target_language,
+                segments=json.dumps(sentences, ensure_ascii=False)
+            ),
+            task="translate",
+            max_tokens=task_max_tokens("translate", " ".join(sentences))
+        )
+        translations = data.get("translations") if isinstance(data, dict) else None
+
+        if not isinstance(translations, list) or len(translations) != len(sentences):
+            logger.warning("Пакетний переклад повернув невідповідну кількість речень")
+            return None
+
+        return [str(item).strip() for item in translations]
+
+    async def translate(self, text: str, target_language: str) -> str:
+        """
+        Перекладає текст, беручи відомі речення з пам'яті і надсилаючи лише нові
+
+        Args:
+            text: Текст для перекладу
+            target_language: Назва мови перекладу
+
+        Returns:
+            Переклад
+        """
+        segments = split_segments(text)
+        sentences = [sentence for sentence, _ in segments if sentence]
+
+        if len(sentences) <= 1:
+            return await translate_text_async(text, target_language)
+
+        known = {}
+        missing = []
+        for sentence in sentences:
+            if sentence in known or sentence in missing:
+                continue
+            cached = self._store.get(self._key(sentence, target_language))
+            if cached is None:
+                missing.append(sentence)
+            else:
+                known[sentence] = cached
+
+        self.segment_hits += len(known)
+        self.segment_misses += len(missing)
+        logger.info(f"Пам'ять перекладів: {len(known)} речень з кешу, {len(missing)} нових")
+
+        if missing:
+            translations = await self._translate_batch(missing, target_language)
+            if translations is None:
+                # Не вдалося зіставити речення - перекладаємо текст цілком
+                return await translate_text_async(text, target_language)
+            for sentence, translation in zip(missing, translations):
+                known[sentence] = translation
+                if translation:
+                    self._store.put(self._key(sentence, target_language), translation)
+
+        return "".join(
+            (known[sentence] if sentence else "") + separator
+            for sentence, separator in segments
+        ).strip()
+
+    def stats(self) -> dict:
+        """Лічильники для діагностики"""
+        return {"segment_hits": self.segment_hits, "segment_misses": self.segment_misses}
+
+
+translation_memory = TranslationMemory()
@@ -0,0 +1,231 @@
+"""
+Кеш згенерованого TTS-аудіо з адресацією за вмістом та повторним використанням file_id Telegram
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from telegram import Message
+from telegram.error import BadRequest
+
+from config import TTS_AUDIO_CACHE_DIR, TTS_AUDIO_CACHE_MAX_BYTES
+from utils.openai_helper import synthesize_speech_async, TTS_MODEL, TTS_VOICE
+from utils.telegram_media import is_file_id_error, fit_caption
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+
+# Скільки file_id зберігати в індексі (file_id не займає місця на диску, тож ліміт окремий від аудіо)
+MAX_FILE_IDS = 20000
+
+
+class TTSAudioCache:
+    """
+    Дисковий LRU-кеш аудіо за ключем hash(text, model, voice)
+
+    Після першого відправлення запам'ятовує file_id голосового повідомлення,
+    тож повтори надсилаються за file_id - без звернення до OpenAI та без завантаження байтів.
+    """
+
+    def __init__(self, directory: str = TTS_AUDIO_CACHE_DIR, max_bytes: int = TTS_AUDIO_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        # key -> розмір файлу (порядок = порядок використання)
+        self._files = OrderedDict()
+        self._bytes = 0
+        # key -> file_id Telegram (порядок = порядок використання)
+        self._file_ids = OrderedDict()
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+        self.file_id_hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text: str, model: str = TTS_MODEL, voice: str = TTS_VOICE) -> str:
+        """Ключ кешу - SHA-256 від моделі, голосу і тексту"""
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load(self):
+        """Відновлює стан кешу з диска при першому зверненні"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".mp3"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+            self._bytes += size
+
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r", encoding="utf-8") as index_file:
+                self._file_ids = OrderedDict(json.load(index_file))
+        except (FileNotFoundError, ValueError):
+            self._file_ids = OrderedDict()
+
+        logger.info(f"TTS аудіо-кеш завантажено: {len(self._files)} файлів, {self._bytes} байт")
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as index_file:
+            json.dump(self._file_ids, index_file)
+        os.replace(tmp_path, path)
+
+    def get_file_id(self, key: str):
+        """Повертає збережений file_id Telegram або None; використання оновлює порядок LRU"""
+        self._load()
+        file_id = self._file_ids.get(key)
+        if file_id is not None:
+            self._file_ids.move_to_end(key)
+            # Аудіо, яке часто надсилається за file_id, не повинно витіснятися з диска першим
+            if key in self._files:
+                self._files.move_to_end(key)
+        return file_id
+
+    def set_file_id(self, key: str, file_id: str):
+        """Запам'ятовує file_id після першого відправлення"""
+        self._load()
+        if self._file_ids.get(key) != file_id:
+            self._file_ids[key] = file_id
+            self._file_ids.move_to_end(key)
+            while len(self._file_ids) > MAX_FILE_IDS:
+                self._file_ids.popitem(last=False)
+            self._save_index()
+
+    def forget_file_id(self, key: str):
+        """Забуває file_id, який Telegram відхилив"""
+        self._load()
+        if self._file_ids.pop(key, None) is not None:
+            self._save_index()
+
+    def get_audio(self, key: str):
+        """Повертає байти аудіо з диска або None"""
+        self._load()
+
+        if key not in self._files:
+            self.misses += 1
+            return None
+
+        try:
+            with open(self._path(key), "rb") as audio_file:
+                audio = audio_file.read()
+        except FileNotFoundError:
+            self._bytes -= self._files.pop(key)
+            self.misses += 1
+            return None
+
+        self._files.move_to_end(key)
+        self.hits += 1
+        return audio
+
+    def put_audio(self, key: str, audio: bytes):
+        """Зберігає аудіо на диск і видаляє найдавніші файли при перевищенні ліміту"""
+        self._load()
+
+        if key in self._files:
+            self._bytes -= self._files.pop(key)
+
+        with open(self._path(key), "wb") as audio_file:
+            audio_file.write(audio)
+
+        self._files[key] = len(audio)
+        self._bytes += len(audio)
+
+        self._evict()
+
+    def _evict(self):
+        # file_id залишається валідним і без файлу, тож індекс file_id тут не чіпаємо
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            old_key, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+            try:
+                os.remove(self._path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        """Лічильники для діагностики"""
+        return {
+            "files": len(self._files),
+            "bytes": self._bytes,
+            "file_ids": len(self._file_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "file_id_hits": self.file_id_hits,
+            "evictions": self.evictions,
+        }
+
+
+tts_audio_cache = TTSAudioCache()
+
+
+def _sent_file_id(message: Message):
+    """file_id відправленого аудіо (Telegram може зберегти MP3 як voice, audio або document)"""
+    media = message.voice or message.audio or message.document
+    return media.file_id if media else None
+
+
+async def reply_tts_voice(message: Message, text: str, caption: str = None, reply_markup=None) -> bool:
+    """
+    Озвучує текст і відповідає голосовим повідомленням, використовуючи кеш
+
+    Порядок: file_id Telegram -> аудіо з диска -> генерація через TTS API.
+
+    Args:
+        message: Повідомлення, на яке відповідаємо
+        text: Текст для озвучення
+        caption: Підпис до голосового (опціонально, обрізається до ліміту Telegram)
+        reply_markup: Клавіатура під голосовим (опціонально)
+
+    Returns:
+        True якщо голосове відправлено, False якщо не вдалося згенерувати аудіо
+    """
+    key = TTSAudioCache.make_key(text)
+    caption = fit_caption(caption)
+
+    file_id = tts_audio_cache.get_file_id(key)
+    if file_id:
+        try:
+            await message.reply_voice(voice=file_id, caption=caption, reply_markup=reply_markup)
+            tts_audio_cache.file_id_hits += 1
+            logger.info(f"TTS відправлено за file_id: {key[:12]}")
+            return True
+        except BadRequest as e:
+            if not is_file_id_error(e):
+                raise
+            logger.warning(f"Telegram відхилив file_id {key[:12]}: {e}")
+            tts_audio_cache.forget_file_id(key)
+
+    audio = tts_audio_cache.get_audio(key)
+    if audio is None:
+        audio = await synthesize_speech_async(text)
+        if audio is None:
+            return False
+        tts_audio_cache.put_audio(key, audio)
+
+    sent = await message.reply_voice(voice=audio, caption=caption, reply_markup=reply_markup)
+
+    sent_file_id = _sent_file_id(sent)
+    if sent_file_id:
+        tts_audio_cache.set_file_id(key, sent_file_id)
+
+    logger.info(f"Стан TTS аудіо-кешу: {tts_audio_cache.stats()}")
+    return True
@@ -0,0 +1,112 @@
+"""
+Обмежений кеш текстів для озвучування (кнопки 🔊)
+"""
+import logging
+import time
+from collections import OrderedDict
+
+from config import TTS_CACHE_MAX_ENTRIES, TTS_CACHE_MAX_BYTES, TTS_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class TTSTextCache:
+    """
+    LRU + TTL кеш текстів для озвучування з обмеженням за кількістю записів і розміром
+
+    Всі операції - O(1) (амортизовано): OrderedDict зберігає порядок використання,
+    найдавніші записи видаляються з початку.
+    """
+
+    def __init__(self, max_entries: int = TTS_CACHE_MAX_ENTRIES,
+                 max_bytes: int = TTS_CACHE_MAX_BYTES, ttl: float = TTS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # key -> (text, розмір у байтах, час додавання)
+        self._items = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        item = self._items.get(key)
+        return item is not None and not self._expired(item)
+
+    def _expired(self, item: tuple) -> bool:
+        return time.monotonic() - item[2] > self.ttl
+
+    def _remove(self, key: str) -> tuple:
+        item = self._items.pop(key)
+        self._bytes -= item[1]
+        return item
+
+    def _evict(self):
+        """Видаляє прострочені записи з початку та найдавніші, поки не вкладемося в ліміти"""
+        while self._items:
+            oldest_key, oldest = next(iter(self._items.items()))
+            over_limit = len(self._items) > self.max_entries or self._bytes > self.max_bytes
+            if not over_limit and not self._expired(oldest):
+                break
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def put(self, key: str, text: str):
+        """Зберігає текст для озвучування"""
+        if key in self._items:
+            self._remove(key)
+
+        size = len(text.encode("utf-8"))
+        self._items[key] = (text, size, time.monotonic())
+        self._bytes += size
+
+        self._evict()
+
+    def get(self, key: str):
+        """
+        Повертає текст за ключем або None, якщо його немає чи він застарів
+        """
+        item = self._items.get(key)
+
+        if item is None:
+            self.misses += 1
+            return None
+
+        if self._expired(item):
+            self._remove(key)
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def pop(self, key: str):
+        """Видаляє запис (після успішного озвучування)"""
+        if key in self._items:
+            return self._remove(key)[0]
+        return None
+
+    def stats(self) -> dict:
+        """Лічильники для діагностики"""
+        return {
+            "entries": len(self._items),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def get_tts_cache(bot_data: dict) -> TTSTextCache:
+    """Повертає кеш текстів з bot_data, створюючи його за потреби"""
+    if 'tts_cache' not in bot_data:
+        bot_data['tts_cache'] = TTSTextCache()
+    return bot_data['tts_cache']
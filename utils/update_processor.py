@@ -0,0 +1,86 @@
+"""
+Паралельна обробка апдейтів: різні чати - одночасно, апдейти одного чату - по черзі
+"""
+import asyncio
+import logging
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config import MAX_CONCURRENT_CHATS
+
+logger = logging.getLogger(__name__)
+
+# Верхня межа апдейтів, що очікують обробки (включно з тими, що стоять у черзі свого чату)
+MAX_PENDING_UPDATES = 1024
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обробляє апдейти різних чатів паралельно (не більше max_concurrent_chats одночасно),
+    а апдейти одного чату - строго в порядку надходження
+
+    Послідовність у межах чату зберігає узгодженими стани ConversationHandler
+    (/gpt, /talk, /quiz, /translate). Апдейт, що чекає свого чату, не займає
+    слот паралельності, тому довгий запит одного користувача не гальмує інших.
+    """
+
+    def __init__(self, max_concurrent_chats: int = MAX_CONCURRENT_CHATS):
+        super().__init__(max_concurrent_updates=MAX_PENDING_UPDATES)
+        self.max_concurrent_chats = max_concurrent_chats
+        self._slots = asyncio.Semaphore(max_concurrent_chats)
+        # chat_id -> [asyncio.Lock, кількість апдейтів чату в роботі або в черзі]
+        self._chats = {}
+        self.processing = 0
+        self.max_chat_queue = 0
+
+    @staticmethod
+    def _chat_key(update: object):
+        """Ключ послідовності: чат, а для апдейтів без чату - користувач"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return f"user_{update.effective_user.id}"
+        return None
+
+    async def _run(self, coroutine):
+        async with self._slots:
+            self.processing += 1
+            try:
+                await coroutine
+            finally:
+                self.processing -= 1
+
+    async def do_process_update(self, update: object, coroutine):
+        key = self._chat_key(update)
+
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        entry = self._chats.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.max_chat_queue = max(self.max_chat_queue, entry[1])
+
+        try:
+            async with entry[0]:
+                await self._run(coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[key]
+
+    async def initialize(self):
+        logger.info(f"Паралельна обробка апдейтів: до {self.max_concurrent_chats} чатів одночасно")
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "active_chats": len(self._chats),
+            "processing": self.processing,
+            "max_chat_queue": self.max_chat_queue,
+        }
@@ -0,0 +1,90 @@
+"""
+Облік використаних токенів по користувачах і режимах та денні бюджети користувачів
+"""
+import logging
+from datetime import date
+
+from config import USER_DAILY_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+
+def _empty_usage() -> dict:
+    return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0}
+
+
+def _add_usage(usage: dict, prompt_tokens: int, completion_tokens: int, latency: float):
+    usage["requests"] += 1
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += completion_tokens
+    usage["latency"] += latency
+
+
+class UsageTracker:
+    """
+    Лічильники токенів (prompt/completion) і затримки за день
+
+    Облік ведеться по користувачах і по профілях задач (gpt, talk, random, ...).
+    Користувач, що перевищив денний бюджет, не блокується: його запити отримують
+    нижчий пріоритет у черзі регулятора OpenAI і чекають лише тоді, коли є інші.
+    """
+
+    def __init__(self, daily_budget: int = USER_DAILY_TOKEN_BUDGET):
+        self.daily_budget = daily_budget
+
+        self._day = date.today()
+        self._users = {}
+        self._tasks = {}
+        self.deprioritized = 0
+
+    def _rollover(self):
+        """Скидає денні лічильники при зміні дати"""
+        today = date.today()
+        if today != self._day:
+            logger.info(f"Використання токенів за {self._day}: {self.stats()}")
+            self._day = today
+            self._users.clear()
+            self._tasks.clear()
+
+    def record(self, user_id, task: str, prompt_tokens: int, completion_tokens: int, latency: float = 0.0):
+        """Враховує один виконаний запит (user_id None - фонові задачі)"""
+        self._rollover()
+        _add_usage(self._tasks.setdefault(task, _empty_usage()), prompt_tokens, completion_tokens, latency)
+        if user_id is not None:
+            _add_usage(self._users.setdefault(user_id, _empty_usage()), prompt_tokens, completion_tokens, latency)
+
+    def used_today(self, user_id) -> int:
+        """Кількість токенів, використаних користувачем сьогодні"""
+        self._rollover()
+        usage = self._users.get(user_id)
+        return usage["prompt_tokens"] + usage["completion_tokens"] if usage else 0
+
+    def over_budget(self, user_id, estimated_tokens: int = 0) -> bool:
+        """
+        Чи перевищить запит денний бюджет користувача
+
+        Args:
+            user_id: ID користувача (None - фонові задачі, без бюджету)
+            estimated_tokens: Оцінка токенів запиту
+
+        Returns:
+            True якщо запит потрібно обслуговувати з нижчим пріоритетом
+        """
+        if not self.daily_budget or user_id is None:
+            return False
+        if self.used_today(user_id) + estimated_tokens <= self.daily_budget:
+            return False
+        self.deprioritized += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "day": str(self._day),
+            "users": len(self._users),
+            "deprioritized": self.deprioritized,
+            "tasks": dict(self._tasks),
+        }
+
+
+# Спільний облік для всього бота
+usage_tracker = UsageTracker()
@@ -0,0 +1,45 @@
+"""
+Завантаження голосових повідомлень у пам'ять (без тимчасових файлів)
+"""
+import io
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from telegram import Bot, Voice
+
+from config import VOICE_SPILL_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def downloaded_voice(bot: Bot, voice: Voice):
+    """
+    Завантажує голосове повідомлення в буфер і закриває його після використання
+
+    За замовчуванням використовується BytesIO. Якщо задано VOICE_SPILL_THRESHOLD,
+    використовується SpooledTemporaryFile, який переходить на диск лише
+    після перевищення порогу (з унікальним ім'ям, тож паралельні голосові не конфліктують).
+
+    Args:
+        bot: Екземпляр бота
+        voice: Голосове повідомлення з update.message.voice
+
+    Yields:
+        Файлоподібний об'єкт з аудіо, позиціонований на початок
+    """
+    if VOICE_SPILL_THRESHOLD > 0:
+        buffer = tempfile.SpooledTemporaryFile(max_size=VOICE_SPILL_THRESHOLD, suffix=".ogg")
+    else:
+        buffer = io.BytesIO()
+
+    try:
+        voice_file = await bot.get_file(voice.file_id)
+        await voice_file.download_to_memory(out=buffer)
+        buffer.seek(0)
+
+        logger.info(f"Голосове повідомлення завантажено в пам'ять: {voice.file_size or 0} байт")
+
+        yield buffer
+    finally:
+        buffer.close()
@@ -0,0 +1,127 @@
+"""
+Окремі смуги виконання для тексту, розпізнавання та синтезу мовлення
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from config import (
+    TEXT_LANE_CONCURRENCY, TRANSCRIPTION_LANE_CONCURRENCY, SYNTHESIS_LANE_CONCURRENCY, LANE_MAX_QUEUE
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LaneBusyError(Exception):
+    """Черга смуги переповнена - запит відхилено одразу, а не після довгого очікування"""
+
+
+class WorkLane:
+    """
+    Смуга з обмеженою кількістю одночасних задач і обмеженою чергою
+
+    Задачі кожного користувача стоять у власній черзі; вільний слот отримує
+    наступний користувач по колу (round-robin), тож серія голосових одного
+    користувача не витісняє інших.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int = LANE_MAX_QUEUE):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+
+        self.active = 0
+        # user_id -> deque[(future, час постановки в чергу)]
+        self._queues = {}
+        self._order = deque()
+
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _release(self):
+        """Передає звільнений слот наступному користувачу по колу"""
+        while self._order:
+            user_id = self._order[0]
+            queue = self._queues[user_id]
+
+            # Скасовані очікувачі просто пропускаємо
+            while queue and queue[0][0].done():
+                queue.popleft()
+            if not queue:
+                self._order.popleft()
+                del self._queues[user_id]
+                continue
+
+            future, enqueued = queue.popleft()
+            self._order.rotate(-1)
+
+            waited = time.monotonic() - enqueued
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+            # Слот переходить до очікувача без зменшення active
+            future.set_result(None)
+            return
+
+        self.active -= 1
+
+    async def _acquire(self, user_id):
+        if self.active < self.concurrency and not self._order:
+            self.active += 1
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise LaneBusyError(f"Смуга {self.name} перевантажена ({self.queue_depth} у черзі)")
+
+        future = asyncio.get_running_loop().create_future()
+        if user_id not in self._queues:
+            self._queues[user_id] = deque()
+            self._order.append(user_id)
+        self._queues[user_id].append((future, time.monotonic()))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот міг бути вже переданий скасованому очікувачу - повертаємо його
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, user_id=None):
+        """Займає слот смуги на час виконання блоку"""
+        await self._acquire(user_id)
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait": self.total_wait / self.completed if self.completed else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+# Текстові запити не чекають за голосовими: у кожного типу роботи власні слоти
+text_lane = WorkLane("text", TEXT_LANE_CONCURRENCY)
+transcription_lane = WorkLane("transcription", TRANSCRIPTION_LANE_CONCURRENCY)
+synthesis_lane = WorkLane("synthesis", SYNTHESIS_LANE_CONCURRENCY)
+
+
+def lanes_stats() -> dict:
+    return {lane.name: lane.stats() for lane in (text_lane, transcription_lane, synthesis_lane)}